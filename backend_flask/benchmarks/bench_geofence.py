@@ -0,0 +1,102 @@
+# Accuracy check and throughput benchmark of geofence.Geofence against
+# geopy's geodesic (the check mark_attendance used to run per scan).
+#
+#   python benchmarks/bench_geofence.py [--points 20000] [--radius-km 0.1]
+#
+# Exits with status 1 if any point further than --tolerance-m from the
+# boundary is classified differently from geodesic.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from geopy.distance import geodesic
+
+from geofence import Geofence
+
+# campus location plus a few hard cases (high latitude, antimeridian, equator)
+CENTRES = [
+    (20.2961, 85.8245),
+    (0.0, 0.0),
+    (59.9139, 10.7522),
+    (-33.8688, 151.2093),
+    (64.8378, -179.9995),
+]
+
+
+def random_points(centre, radius_km, count, rng):
+    # uniform bearing, distances spread over 0..3x the radius with extra
+    # density right at the boundary
+    lat0, lng0 = centre
+    points = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            distance = rng.uniform(0.0, 3 * radius_km)
+        else:
+            distance = radius_km * rng.uniform(0.98, 1.02)
+        bearing = rng.uniform(0.0, 360.0)
+        destination = geodesic(kilometers=distance).destination((lat0, lng0), bearing)
+        points.append((destination.latitude, destination.longitude))
+    return points
+
+
+def check_accuracy(radius_km, count, tolerance_m, rng):
+    failures = 0
+    for centre in CENTRES:
+        fence = Geofence(centre[0], centre[1], radius_km)
+        points = random_points(centre, radius_km, count, rng)
+        lats = np.array([p[0] for p in points])
+        lngs = np.array([p[1] for p in points])
+        vectorized = fence.contains_many(lats, lngs)
+        mismatches = 0
+        for index, (lat, lng) in enumerate(points):
+            distance = geodesic(centre, (lat, lng)).km
+            expected = distance <= radius_km
+            if abs(distance - radius_km) * 1000 <= tolerance_m:
+                continue  # too close to the boundary to call
+            if fence.contains(lat, lng) != expected or bool(vectorized[index]) != expected:
+                mismatches += 1
+        failures += mismatches
+        print(f"accuracy  centre={centre}  points={count}  mismatches={mismatches}")
+    return failures
+
+
+def bench(label, func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:>14,.0f} points/s  ({elapsed * 1e6 / count:.3f} us/point)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--radius-km', type=float, default=0.1)
+    parser.add_argument('--tolerance-m', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    failures = check_accuracy(args.radius_km, max(1, args.points // 10), args.tolerance_m, rng)
+
+    centre = CENTRES[0]
+    points = random_points(centre, args.radius_km, args.points, rng)
+    lats = np.array([p[0] for p in points])
+    lngs = np.array([p[1] for p in points])
+    fence = Geofence(centre[0], centre[1], args.radius_km)
+
+    bench('geodesic', lambda: [geodesic(centre, p).km <= args.radius_km for p in points], len(points))
+    bench('Geofence.contains', lambda: [fence.contains(lat, lng) for lat, lng in points], len(points))
+    bench('Geofence.contains_many', lambda: fence.contains_many(lats, lngs), len(points))
+
+    if failures:
+        print(f"FAILED: {failures} points classified differently from geodesic")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
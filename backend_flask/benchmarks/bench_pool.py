@@ -0,0 +1,91 @@
+# Requests per second with and without connection pooling, against the
+# local MySQL configured in app.py.
+#
+#   python benchmarks/bench_pool.py [--requests 2000] [--threads 16] [--pool-size 10]
+#
+# Each run drives the app in-process (Flask test client) with a cheap
+# DB-backed route, first with MYSQL_POOL_SIZE = 0 (a new connection per
+# request, like flask_mysqldb) and then with the pool.
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, mysql
+
+ROUTE = '/attendance_report?student_id={student_id}&summary=1'
+
+
+def run(pool_size, total_requests, threads, student_id):
+    app.config['MYSQL_POOL_SIZE'] = pool_size
+    app.config['AUTO_FINALIZE'] = False
+    mysql.reset()
+    latencies = []
+    lock = threading.Lock()
+    per_thread = total_requests // threads
+    errors = []
+
+    def worker():
+        client = app.test_client()
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            response = client.get(ROUTE.format(student_id=student_id))
+            local.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'pool_size': pool_size,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(quantiles[49] * 1000, 3),
+        'p95_ms': round(quantiles[94] * 1000, 3),
+        'p99_ms': round(quantiles[98] * 1000, 3),
+        'pool': mysql.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--student-id', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = [
+        run(0, args.requests, args.threads, args.student_id),
+        run(args.pool_size, args.requests, args.threads, args.student_id),
+    ]
+    for result in results:
+        label = 'no pool' if result['pool_size'] == 0 else f"pool={result['pool_size']}"
+        print(f"{label:<10} {result['requests_per_second']:>10} req/s  p50 {result['p50_ms']} ms  "
+              f"p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  errors {result['errors']}")
+    speedup = results[1]['requests_per_second'] / results[0]['requests_per_second']
+    print(f"speedup: {speedup:.2f}x")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'speedup': speedup}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+# Runs EXPLAIN on the SQL in app.py against a seeded scratch database and
+# fails if a query reads a whole table.
+#
+#   python benchmarks/explain_check.py [--database attendance_explain_check]
+#                                      [--students 20000] [--keep] [--output plans.json]
+#
+# The scratch database is created from database_schema.sql (which must be
+# at the newest migration), filled with a realistic amount of rows so the
+# optimizer has a reason to use the indexes, and dropped again afterwards.
+# Queries are taken from app.py with the ast module: every string passed to
+# execute / executemany or assigned to a name that reads like SQL. f-strings
+# and .format() are resolved when they only use module level string
+# constants; %s placeholders are replaced by sample values. Queries
+# assembled at runtime (IN lists, optional filters) are explained through the
+# rendered examples in RUNTIME_QUERIES, one list per function. Exits with
+# status 1 when a query does a full scan (type ALL) of a table outside
+# ALLOWED_FULL_SCANS, or when a function builds a query at runtime and has no
+# RUNTIME_QUERIES entry.
+import argparse
+import ast
+import json
+import os
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import MySQLdb
+
+import migrate
+from app import app, SUMMARY_SELECT, TERM_SQL
+
+APP_SOURCE = os.path.join(BACKEND_DIR, 'app.py')
+SCHEMA = os.path.join(BACKEND_DIR, 'database_schema.sql')
+
+SQL = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\s+\S', re.IGNORECASE)
+TABLE_REF = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+NOT_ALIAS = {'where', 'join', 'left', 'right', 'inner', 'on', 'set', 'order', 'group', 'limit',
+             'values', 'select', 'union', 'using', 'having'}
+DATETIME_PARAM = re.compile(r'\b(expiry_time|timestamp)\s*(=|<=|>=|<|>)\s*%s', re.IGNORECASE)
+INTEGER_PARAM = re.compile(r'\b(LIMIT|OFFSET)\s+%s', re.IGNORECASE)
+
+# functions whose statements read whole tables on purpose
+ALLOWED_FULL_SCANS = {
+    'check_summary_command': 'CLI consistency check of the whole summary',
+    'rebuild_summary_command': 'CLI rebuild of the whole summary',
+    'rebuild_summary': 'full rebuild when called without student ids',
+}
+
+CLASSES = 40
+TEACHERS = 50
+SESSIONS_PER_CLASS = 50
+STUDENTS_PER_SESSION = 40
+# sample value for "expiry_time >= %s" and similar: near the newest seeded
+# session, like the startup scan for sessions still to finalize
+SAMPLE_DATETIME = '2026-06-29 00:00:00'
+SEED_START = datetime(2025, 1, 1)
+SEED_END = datetime(2026, 6, 30)
+
+# rendered instances of the queries app.py builds at runtime, as
+# (sql, params) with values from the seeded data; keep in step with the
+# builders, every filter combination that changes the plan has an entry
+RUNTIME_QUERIES = {
+    'get_sessions_info': [
+        ("""SELECT id, expiry_time, latitude, longitude, class, created_by, session_code
+            FROM session WHERE id IN (%s, %s, %s)""", [1, 2, 3]),
+    ],
+    'rebuild_summary': [
+        ("DELETE FROM student_attendance_summary WHERE student_id IN (%s, %s)", [1000, 1001]),
+        (f"""INSERT INTO student_attendance_summary (student_id, class, term, present_count, absent_count)
+            {SUMMARY_SELECT.format(where='WHERE a.student_id IN (%s, %s)')}""", [1000, 1001]),
+    ],
+    'mark_attendance_batch': [
+        ("SELECT id FROM student WHERE id IN (%s, %s, %s)", [1000, 1040, 1080]),
+        ("""SELECT student_id, session_id FROM attendance
+            WHERE session_id IN (%s, %s) AND student_id IN (%s, %s, %s)""", [1, 2, 1000, 1040, 1080]),
+    ],
+    'attendance_report': [
+        # from/to totals, without and with the class / term filters
+        ("""SELECT COALESCE(SUM(a.status = 'PRESENT'), 0), COALESCE(SUM(a.status = 'ABSENT'), 0)
+            FROM attendance a
+            WHERE a.student_id = %s AND a.timestamp >= %s AND a.timestamp < %s""",
+         [1000, '2026-01-01 00:00:00', '2026-04-01 00:00:00']),
+        (f"""SELECT COALESCE(SUM(a.status = 'PRESENT'), 0), COALESCE(SUM(a.status = 'ABSENT'), 0)
+            FROM attendance a
+            JOIN session s ON a.session_id = s.id
+            WHERE a.student_id = %s AND s.class = %s AND {TERM_SQL.format('s.expiry_time')} = %s
+              AND a.timestamp >= %s""",
+         [1000, 'CLASS-00', '2026-1', '2026-01-01 00:00:00']),
+        # whole-history totals from the summary
+        ("""SELECT COALESCE(SUM(present_count), 0), COALESCE(SUM(absent_count), 0)
+            FROM student_attendance_summary
+            WHERE student_id = %s""", [1000]),
+        ("""SELECT COALESCE(SUM(present_count), 0), COALESCE(SUM(absent_count), 0)
+            FROM student_attendance_summary
+            WHERE student_id = %s AND class = %s AND term = %s""", [1000, 'CLASS-00', '2026-1']),
+        # record pages, first and following (keyset cursor)
+        ("""SELECT a.id, a.session_id, a.status, a.timestamp
+            FROM attendance a
+            WHERE a.student_id = %s
+            ORDER BY a.timestamp DESC, a.id DESC
+            LIMIT %s""", [1000, 51]),
+        (f"""SELECT a.id, a.session_id, a.status, a.timestamp
+            FROM attendance a
+            JOIN session s ON a.session_id = s.id
+            WHERE a.student_id = %s AND s.class = %s AND {TERM_SQL.format('s.expiry_time')} = %s
+              AND (a.timestamp < %s OR (a.timestamp = %s AND a.id < %s))
+            ORDER BY a.timestamp DESC, a.id DESC
+            LIMIT %s""", [1000, 'CLASS-00', '2026-1', '2026-03-01 09:00:00', '2026-03-01 09:00:00', 5000, 51]),
+    ],
+    'student_list_response': [
+        # JSON pages, all students and one class
+        ("SELECT id, name, class, email, phone FROM student WHERE id > %s ORDER BY id LIMIT %s", [1000, 101]),
+        ("SELECT id, name FROM student WHERE class = %s AND id > %s ORDER BY id LIMIT %s", ['CLASS-00', 1000, 101]),
+        # ndjson streams
+        ("SELECT id, name, class, email, phone FROM student WHERE id > %s ORDER BY id", [1000]),
+        ("SELECT id, name, class, email, phone FROM student WHERE class = %s ORDER BY id LIMIT %s",
+         ['CLASS-00', 1000]),
+    ],
+    'get_sessions': [
+        (f"""SELECT s.id, s.session_name, s.session_code, s.expiry_time, s.created_by, u.name, s.class
+            FROM session s
+            LEFT JOIN user u ON u.id = s.created_by
+            {where}
+            ORDER BY s.id
+            LIMIT %s""", params + [101])
+        for where, params in [
+            ("WHERE s.id > %s", [100]),
+            ("WHERE s.class = %s", ['CLASS-00']),
+            ("WHERE s.created_by = %s", [2]),
+            ("WHERE s.expiry_time >= %s", [SAMPLE_DATETIME]),
+            ("WHERE s.expiry_time >= %s AND s.expiry_time < %s", ['2026-06-01 00:00:00', SAMPLE_DATETIME]),
+            ("WHERE s.id > %s AND s.class = %s AND s.created_by = %s", [100, 'CLASS-00', 2]),
+        ]
+    ],
+    'stream_session_attendance': [
+        ("""SELECT s.session_name, a.student_id, st.name, a.status, a.timestamp
+            FROM session s
+            LEFT JOIN attendance a ON a.session_id = s.id
+            LEFT JOIN student st ON st.id = a.student_id
+            WHERE s.id = %s
+            ORDER BY a.id""", [1]),
+    ],
+    'export_attendance': [
+        (f"""SELECT s.id, s.session_name, s.expiry_time, a.student_id, st.name, a.status, a.timestamp
+            FROM session s
+            JOIN attendance a ON a.session_id = s.id
+            LEFT JOIN student st ON st.id = a.student_id
+            WHERE {where}
+            ORDER BY s.expiry_time, s.id, a.student_id""", params)
+        for where, params in [
+            ("s.class = %s", ['CLASS-00']),
+            ("s.class = %s AND a.timestamp >= %s AND a.timestamp < %s",
+             ['CLASS-00', '2026-01-01 00:00:00', '2026-04-01 00:00:00']),
+        ]
+    ],
+}
+
+
+# --- query extraction
+
+def _evaluate(node, namespace):
+    try:
+        value = eval(compile(ast.Expression(node), APP_SOURCE, 'eval'), {'__builtins__': {}}, dict(namespace))
+    except Exception:
+        return None
+    return value if isinstance(value, str) else None
+
+
+def _assignments(statements, namespace):
+    # string constants bound by plain assignments, in source order
+    for node in statements:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            value = _evaluate(node.value, namespace)
+            if value is None:
+                namespace.pop(node.targets[0].id, None)
+            else:
+                namespace[node.targets[0].id] = value
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+            namespace.pop(node.target.id, None)
+    return namespace
+
+
+def extract_queries(path=APP_SOURCE):
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    module_namespace = _assignments(tree.body, {})
+    queries = {}  # normalized sql -> {'sql', 'lines', 'functions'}
+    skipped = []
+
+    def add(sql, line, function):
+        if '{' in sql:
+            return  # a .format() template, explained where it is formatted
+        key = ' '.join(sql.split())
+        entry = queries.setdefault(key, {'sql': sql, 'lines': [], 'functions': set()})
+        entry['lines'].append(line)
+        entry['functions'].add(function)
+
+    for name, value in module_namespace.items():
+        if SQL.match(value):
+            add(value, next(node.lineno for node in tree.body if isinstance(node, ast.Assign)
+                            and getattr(node.targets[0], 'id', None) == name), '<module>')
+
+    functions = [node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    for function in functions:
+        statements = sorted((node for node in ast.walk(function) if isinstance(node, (ast.Assign, ast.AugAssign))),
+                            key=lambda node: (node.lineno, node.col_offset))
+        namespace = _assignments(statements, dict(module_namespace))
+        for node in ast.walk(function):
+            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+                value = namespace.get(node.targets[0].id)
+                if value is not None and SQL.match(value):
+                    add(value, node.lineno, function.name)
+            elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                  and node.func.attr in ('execute', 'executemany') and node.args):
+                value = _evaluate(node.args[0], namespace)
+                if value is None:
+                    skipped.append({'line': node.lineno, 'function': function.name})
+                elif SQL.match(value):
+                    add(value, node.lineno, function.name)
+    for entry in queries.values():
+        entry['functions'] = sorted(entry['functions'])
+        entry['lines'] = sorted(set(entry['lines']))
+    return list(queries.values()), skipped
+
+
+# the RUNTIME_QUERIES examples of the functions with runtime built queries,
+# and the call sites of functions that have none
+def runtime_queries(skipped):
+    queries = []
+    unregistered = []
+    lines = {}
+    for entry in skipped:
+        if entry['function'] in RUNTIME_QUERIES:
+            lines.setdefault(entry['function'], []).append(entry['line'])
+        else:
+            unregistered.append(entry)
+    for function, examples in RUNTIME_QUERIES.items():
+        for sql, params in examples:
+            queries.append({'sql': sql, 'params': params, 'lines': sorted(lines.get(function, [])),
+                            'functions': [function], 'runtime': True})
+    return queries, unregistered
+
+
+def with_sample_params(sql):
+    sql = INTEGER_PARAM.sub(lambda m: f'{m.group(1)} 1', sql)
+    sql = DATETIME_PARAM.sub(lambda m: f"{m.group(1)} {m.group(2)} '{SAMPLE_DATETIME}'", sql)
+    return sql.replace('%s', "'1'").replace('%%', '%')
+
+
+def table_aliases(sql):
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in NOT_ALIAS:
+            aliases[alias] = table
+    return aliases
+
+
+# --- scratch database
+
+def create_database(cur, database):
+    with open(SCHEMA, encoding='utf-8') as f:
+        script = f.read().replace('attendance_app', database)
+    for statement in migrate.split_statements(script):
+        cur.execute(statement)
+
+
+def seed(cur, students_total, rng):
+    users = [('Admin', 'admin@example.edu', '9000000000', 'x', 'ADMIN')]
+    users += [(f'Teacher {i}', f'teacher{i}@example.edu', f'91{i:08d}', 'x', 'TEACHER') for i in range(TEACHERS)]
+    users += [(f'Student {i}', f'student{i}@example.edu', f'92{i:08d}', 'x', 'STUDENT') for i in range(students_total)]
+    insert_many(cur, "INSERT INTO user (name, email, phone, password, role) VALUES (%s, %s, %s, %s, %s)", users)
+    cur.execute("SELECT id FROM user WHERE role = 'TEACHER'")
+    teacher_ids = [row[0] for row in cur.fetchall()]
+
+    classes = [f'CLASS-{i:02d}' for i in range(CLASSES)]
+    students = [(1000 + i, f'Student {i}', classes[i % CLASSES], f'student{i}@example.edu', f'92{i:08d}')
+                for i in range(students_total)]
+    insert_many(cur, "INSERT INTO student (id, name, class, email, phone) VALUES (%s, %s, %s, %s, %s)", students)
+    by_class = {}
+    for student in students:
+        by_class.setdefault(student[2], []).append(student[0])
+
+    span = (SEED_END - SEED_START).total_seconds()
+    sessions = []
+    for class_name in classes:
+        for i in range(SESSIONS_PER_CLASS):
+            expiry = SEED_START + timedelta(seconds=rng.uniform(0, span))
+            sessions.append((f'{class_name} lecture {i}', f'{class_name}-{i}', expiry,
+                             rng.choice(teacher_ids), class_name, 20.2961, 85.8245))
+    insert_many(cur, """
+        INSERT INTO session (session_name, session_code, expiry_time, created_by, class, latitude, longitude)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, sessions)
+
+    cur.execute("SELECT id, class, expiry_time FROM session")
+    attendance = []
+    for session_id, class_name, expiry in cur.fetchall():
+        members = by_class.get(class_name, [])
+        for student_id in rng.sample(members, min(STUDENTS_PER_SESSION, len(members))):
+            status = 'PRESENT' if rng.random() < 0.8 else 'ABSENT'
+            attendance.append((student_id, session_id, status, expiry - timedelta(minutes=rng.uniform(0, 10))))
+    insert_many(cur, "INSERT INTO attendance (student_id, session_id, status, timestamp) VALUES (%s, %s, %s, %s)",
+                attendance)
+    cur.execute("""
+        INSERT INTO student_attendance_summary (student_id, class, term, present_count, absent_count)
+        SELECT a.student_id, s.class,
+               CONCAT(YEAR(s.expiry_time), IF(MONTH(s.expiry_time) <= 6, '-1', '-2')) AS term,
+               SUM(a.status = 'PRESENT'), SUM(a.status = 'ABSENT')
+        FROM attendance a
+        JOIN session s ON s.id = a.session_id
+        GROUP BY a.student_id, s.class, term
+    """)
+    for table in ('user', 'student', 'session', 'attendance', 'student_attendance_summary'):
+        cur.execute(f"ANALYZE TABLE {table}")
+        cur.fetchall()
+    return {'users': len(users), 'students': len(students), 'sessions': len(sessions), 'attendance': len(attendance)}
+
+
+def insert_many(cur, sql, rows, chunk_size=5000):
+    for start in range(0, len(rows), chunk_size):
+        cur.executemany(sql, rows[start:start + chunk_size])
+
+
+# --- check
+
+def explain(cur, query):
+    if 'params' in query:
+        cur.execute('EXPLAIN ' + query['sql'], query['params'])
+    else:
+        cur.execute('EXPLAIN ' + with_sample_params(query['sql']))
+    columns = [column[0] for column in cur.description]
+    plan = [dict(zip(columns, row)) for row in cur.fetchall()]
+    aliases = table_aliases(query['sql'])
+    full_scans = []
+    for step in plan:
+        # the target row of EXPLAIN INSERT always says ALL
+        if step.get('type') != 'ALL' or step.get('select_type') == 'INSERT' or not step.get('table'):
+            continue
+        table = aliases.get(step['table'])
+        if table:
+            full_scans.append(table)
+    return plan, full_scans
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default=app.config['MYSQL_HOST'])
+    parser.add_argument('--user', default=app.config['MYSQL_USER'])
+    parser.add_argument('--password', default=app.config['MYSQL_PASSWORD'])
+    parser.add_argument('--database', default='attendance_explain_check',
+                        help='scratch database, dropped and recreated')
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help='do not drop the scratch database afterwards')
+    parser.add_argument('--output', help='write the plans as JSON to this file')
+    args = parser.parse_args()
+    if args.database == app.config['MYSQL_DB']:
+        parser.error('--database must not be the application database, it is dropped')
+
+    queries, skipped = extract_queries()
+    examples, unregistered = runtime_queries(skipped)
+    queries += examples
+    connection = MySQLdb.connect(host=args.host, user=args.user, passwd=args.password)
+    cur = connection.cursor()
+    failures = []
+    results = []
+    try:
+        create_database(cur, args.database)
+        unapplied = migrate.pending(cur, migrate.discover())
+        if unapplied:
+            print(f"database_schema.sql is missing migrations: {', '.join(m.name for m in unapplied)}")
+            failures.append({'schema': [m.name for m in unapplied]})
+        counts = seed(cur, args.students, random.Random(args.seed))
+        connection.commit()
+        print(f"seeded {counts}")
+        for query in queries:
+            try:
+                plan, full_scans = explain(cur, query)
+            except MySQLdb.Error as e:
+                print(f"line {query['lines']}: EXPLAIN failed: {e}")
+                failures.append({'lines': query['lines'], 'error': str(e)})
+                continue
+            # a rendered example stands for the filtered form of its query,
+            # the whole-table forms are the ones extracted from the source
+            allowed = not query.get('runtime') and all(function in ALLOWED_FULL_SCANS
+                                                       for function in query['functions'])
+            status = 'ok' if not full_scans else ('allowed' if allowed else 'FULL SCAN')
+            print(f"{status:<9} line {','.join(map(str, query['lines'])):<12} {' '.join(query['sql'].split())[:90]}")
+            if full_scans and not allowed:
+                print(f"          full scan of {', '.join(sorted(set(full_scans)))}")
+                failures.append({'lines': query['lines'], 'full_scans': sorted(set(full_scans))})
+            results.append({**query, 'status': status, 'plan': plan})
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP DATABASE IF EXISTS {args.database}")
+        cur.close()
+        connection.close()
+
+    for entry in unregistered:
+        print(f"UNCHECKED line {entry['line']:<12} query built at runtime in {entry['function']}(), "
+              f"add examples to RUNTIME_QUERIES")
+        failures.append({'lines': [entry['line']], 'unregistered': entry['function']})
+    print(f"{len(results)} queries explained ({len(examples)} runtime examples), "
+          f"{len(unregistered)} unchecked, {len(failures)} failures")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'queries': results, 'unchecked': unregistered, 'failures': failures}, f, indent=2, default=str)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
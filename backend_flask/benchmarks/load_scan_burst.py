@@ -0,0 +1,294 @@
+# Replays the start of a class: every student of a roster scans the QR code
+# of one session within a short window (some twice or three times, some
+# from outside the geofence) while the teacher keeps polling the session's
+# attendance. Reports throughput and p50/p95/p99 latency per route.
+#
+#   python benchmarks/load_scan_burst.py [--base-url http://127.0.0.1:5000]
+#       [--students 300] [--burst-seconds 30] [--concurrency 64]
+#       [--output run.json] [--baseline baseline.json]
+#
+# Without --base-url the app is driven in-process (Flask test client)
+# against the MySQL configured in app.py. The roster, teacher and session
+# are seeded through register_user, add_student and add_session under a
+# unique class name; --cleanup deletes the session and students afterwards.
+# With --baseline the run is compared with an earlier --output file and
+# the exit code is 1 if a route's p95 got worse by more than --tolerance.
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# campus location the session's geofence is centred on (app.ALLOWED_LOCATION)
+CENTER = (20.2961, 85.8245)
+EARTH_RADIUS_KM = 6371.0088
+
+
+# a point `distance_km` away from `center` in a random direction
+def offset_point(center, distance_km, rng):
+    bearing = rng.uniform(0, 2 * math.pi)
+    lat = center[0] + math.degrees(distance_km * math.cos(bearing) / EARTH_RADIUS_KM)
+    lng = center[1] + math.degrees(distance_km * math.sin(bearing) / EARTH_RADIUS_KM) / math.cos(math.radians(center[0]))
+    return lat, lng
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def call(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class InProcessClient:
+    def __init__(self):
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def call(self, method, path, payload=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=payload)
+        return response.status_code, response.get_data()
+
+
+# latencies and status codes per route
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # route -> [(seconds, status)]
+
+    def call(self, client, method, path, payload=None):
+        start = time.perf_counter()
+        status, body = client.call(method, path, payload)
+        elapsed = time.perf_counter() - start
+        route = path.split('?', 1)[0]
+        with self._lock:
+            self.samples.setdefault(route, []).append((elapsed, status))
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    report = {}
+    for route, values in sorted(samples.items()):
+        latencies = sorted(seconds for seconds, _ in values)
+        statuses = {}
+        for _, status in values:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        report[route] = {
+            'requests': len(values),
+            'requests_per_second': round(len(values) / elapsed, 1) if elapsed else None,
+            'statuses': statuses,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3),
+        }
+    return report
+
+
+def seed(client, recorder, args, rng):
+    tag = f"{int(time.time())}{rng.randrange(1000):03d}"
+    class_name = args.class_name or f"LOAD-{tag}"
+    status, body = recorder.call(client, 'POST', '/register_user', {
+        'name': 'Load Test Teacher', 'email': f'load-teacher-{tag}@example.com',
+        'phone': '0000000000', 'password': f'load-{tag}', 'role': 'TEACHER',
+    })
+    if status != 201:
+        raise SystemExit(f'register_user failed ({status}): {body}')
+    teacher_id = body['user_id']
+
+    # ids well away from real roll numbers, unique per run, within INT range
+    first_id = args.first_student_id or 1000000000 + int(tag) % 1000000 * 1000
+    student_ids = list(range(first_id, first_id + args.students))
+    with ThreadPoolExecutor(max_workers=min(args.concurrency, 16)) as pool:
+        results = list(pool.map(lambda student_id: recorder.call(client, 'POST', '/add_student', {
+            'id': student_id, 'name': f'Student {student_id}', 'class': class_name,
+            'email': f'student-{student_id}-{tag}@example.com', 'phone': '0000000000',
+            'request_id': teacher_id,
+        }), student_ids))
+    failed = [body for status, body in results if status != 201]
+    if failed:
+        raise SystemExit(f'add_student failed for {len(failed)} students, first error: {failed[0]}')
+
+    expiry = datetime.now() + timedelta(seconds=args.burst_seconds + args.session_minutes * 60)
+    status, body = recorder.call(client, 'POST', '/add_session', {
+        'session_name': f'Load test {tag}', 'expiry_time': expiry.strftime('%Y-%m-%d %H:%M:%S'),
+        'created_by': teacher_id, 'class': class_name,
+        'latitude': CENTER[0], 'longitude': CENTER[1],
+    })
+    if status != 201:
+        raise SystemExit(f'add_session failed ({status}): {body}')
+    return class_name, teacher_id, body['session_id'], student_ids
+
+
+# every student scans once at a random point of the burst; some scan again a
+# few seconds later, some are outside the geofence (0.5 - 2 km away)
+def scan_plan(student_ids, session_id, args, rng):
+    plan = []
+    for student_id in student_ids:
+        outside = rng.random() < args.outside_rate
+        lat, lng = offset_point(CENTER, rng.uniform(0.5, 2.0) if outside else rng.uniform(0, 0.05), rng)
+        payload = {'student_id': student_id, 'session_id': session_id, 'latitude': lat, 'longitude': lng}
+        at = rng.uniform(0, args.burst_seconds)
+        plan.append((at, payload, 'ABSENT' if outside else 'PRESENT'))
+        if rng.random() < args.duplicate_rate:
+            for _ in range(rng.choice((1, 2))):
+                at = min(args.burst_seconds, at + rng.uniform(0.2, 5.0))
+                plan.append((at, payload, 'already_marked'))
+    plan.sort(key=lambda item: item[0])
+    return plan
+
+
+def run_burst(client, recorder, plan, session_id, teacher_id, args):
+    outcomes = {}
+    unexpected = []
+    lock = threading.Lock()
+
+    def scan(payload, expected):
+        status, body = recorder.call(client, 'POST', '/mark_attendance', payload)
+        outcome = (body or {}).get('status', str(status))
+        with lock:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            # a repeat scan racing the first one may get either answer
+            if outcome != expected and expected != 'already_marked':
+                unexpected.append((payload['student_id'], expected, outcome, status))
+
+    done = threading.Event()
+
+    def poll():
+        path = f'/get_session_attendance?session_id={session_id}&request_id={teacher_id}'
+        while not done.is_set():
+            recorder.call(client, 'GET', path)
+            done.wait(args.poll_interval)
+
+    poller = threading.Thread(target=poll, daemon=True)
+    start = time.perf_counter()
+    poller.start()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for at, payload, expected in plan:
+            delay = at - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(scan, payload, expected)
+    done.set()
+    poller.join()
+    return time.perf_counter() - start, outcomes, unexpected
+
+
+def cleanup(client, recorder, session_id, teacher_id, student_ids):
+    recorder.call(client, 'DELETE', '/delete_session', {'id': session_id, 'request_id': teacher_id})
+    for student_id in student_ids:
+        recorder.call(client, 'DELETE', '/delete_student', {'student_id': student_id, 'request_id': teacher_id})
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    print(f"\n{'route':<28} {'p95 base':>10} {'p95 now':>10} {'change':>8} {'rps base':>9} {'rps now':>9}")
+    for route, now in report.items():
+        before = baseline.get(route)
+        if not before:
+            continue
+        change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        print(f"{route:<28} {before['p95_ms']:>10} {now['p95_ms']:>10} {change:>+8.1%} "
+              f"{before['requests_per_second']:>9} {now['requests_per_second']:>9}")
+        if change > tolerance:
+            regressions.append(route)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', help='running server to test, default: in-process test client')
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--burst-seconds', type=float, default=30.0)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duplicate-rate', type=float, default=0.3, help='share of students who scan again')
+    parser.add_argument('--outside-rate', type=float, default=0.05, help='share of scans outside the geofence')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds between teacher polls')
+    parser.add_argument('--session-minutes', type=int, default=10, help='session lifetime after the burst')
+    parser.add_argument('--class-name')
+    parser.add_argument('--first-student-id', type=int)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cleanup', action='store_true', help='delete the seeded session and students')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='results JSON of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 regression against the baseline')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    client = HttpClient(args.base_url) if args.base_url else InProcessClient()
+
+    seeding = Recorder()
+    seed_start = time.perf_counter()
+    class_name, teacher_id, session_id, student_ids = seed(client, seeding, args, rng)
+    seed_elapsed = time.perf_counter() - seed_start
+    print(f"seeded class {class_name}: {len(student_ids)} students, session {session_id} ({seed_elapsed:.1f}s)")
+
+    plan = scan_plan(student_ids, session_id, args, rng)
+    burst = Recorder()
+    elapsed, outcomes, unexpected = run_burst(client, burst, plan, session_id, teacher_id, args)
+    report = summarize(burst.samples, elapsed)
+
+    print(f"\n{len(plan)} scans in {elapsed:.1f}s, outcomes: {outcomes}")
+    if unexpected:
+        print(f"{len(unexpected)} unexpected outcomes, first: {unexpected[:5]}")
+    print(f"\n{'route':<28} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for route, stats in report.items():
+        print(f"{route:<28} {stats['requests']:>9} {stats['requests_per_second']:>8} {stats['p50_ms']:>9} "
+              f"{stats['p95_ms']:>9} {stats['p99_ms']:>9}  {stats['statuses']}")
+
+    if args.cleanup:
+        cleanup(client, seeding, session_id, teacher_id, student_ids)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+                'scan_count': len(plan),
+                'elapsed_seconds': round(elapsed, 3),
+                'outcomes': outcomes,
+                'unexpected_outcomes': len(unexpected),
+                'routes': report,
+                'seeding': summarize(seeding.samples, seed_elapsed),
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['routes']
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\np95 regressed by more than {args.tolerance:.0%} on: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
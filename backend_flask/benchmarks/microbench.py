@@ -0,0 +1,245 @@
+# Microbenchmarks of the CPU-bound steps of the hot routes in app.py, next to
+# the implementations they replaced where there is one.
+#
+#   python benchmarks/microbench.py [--only qr] [--repeat 5] [--rows 10000]
+#                                   [--output micro.json] [--baseline old.json]
+#
+# geo     geopy geodesic (the old per-scan check) vs haversine / Geofence
+# qr      qrcode.make + PNG + base64 (old generate_qr) vs render_qr, cache hit
+# auth    check_password_hash with the hash generate_password_hash makes now
+# json    jsonify of large student and attendance lists vs the NDJSON stream
+# import  pandas df.iterrows() (old import_students) vs itertuples and the
+#         importer's csv reader, each followed by importer.clean_row
+#
+# Every case is timed with timeit (autorange picks the loop count, best and
+# median of --repeat runs are reported per call). No database is needed.
+# With --baseline, exits with status 1 if a case's median got slower than
+# --tolerance compared with the earlier run.
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import timeit
+from datetime import datetime, timedelta
+from importlib import metadata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import qrcode
+from flask import jsonify
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import importer
+from app import app, qr_cache, render_qr
+from geofence import Geofence, haversine_km
+from streaming import ndjson_stream
+
+CENTRE = (20.2961, 85.8245)
+RADIUS_KM = 0.1
+CLASSES = ['CSE-A', 'CSE-B', 'ECE-A', 'ME-A']
+
+
+def students(count, rng):
+    return [{
+        'id': 1000 + i,
+        'name': f'Student {i}',
+        'class': rng.choice(CLASSES),
+        'email': f'student{i}@example.edu',
+        'phone': f'9{rng.randrange(10 ** 9):09d}',
+    } for i in range(count)]
+
+
+def attendance(count, rng):
+    start = datetime(2026, 1, 5, 9, 0)
+    return [{
+        'student_id': 1000 + i % 300,
+        'session_id': 1 + i // 300,
+        'status': 'PRESENT' if rng.random() < 0.8 else 'ABSENT',
+        'timestamp': start + timedelta(seconds=i * 7),
+    } for i in range(count)]
+
+
+def students_csv(records):
+    lines = [','.join(importer.REQUIRED_COLUMNS)]
+    lines.extend(','.join(str(record[column]) for column in importer.REQUIRED_COLUMNS) for record in records)
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def geo_cases(args, rng):
+    point = (CENTRE[0] + rng.uniform(-0.001, 0.001), CENTRE[1] + rng.uniform(-0.001, 0.001))
+    fence = Geofence(CENTRE[0], CENTRE[1], RADIUS_KM)
+    cases = {
+        'geo.haversine_check': lambda: haversine_km(CENTRE[0], CENTRE[1], point[0], point[1]) <= RADIUS_KM,
+        'geo.geofence_contains': lambda: fence.contains(point[0], point[1]),
+    }
+    try:
+        from geopy.distance import geodesic
+    except ImportError:
+        print('geopy is not installed, skipping geo.geodesic_check')
+    else:
+        cases['geo.geodesic_check'] = lambda: geodesic(CENTRE, point).km <= RADIUS_KM
+    return cases
+
+
+def qr_cases(args, rng):
+    payload = str({'session_id': 42, 'session_code': 'a3f1c2d4-5b6e-4f70-8a9b-0c1d2e3f4a5b',
+                   'expiry_time': '2026-01-05 10:00:00', 'latitude': CENTRE[0], 'longitude': CENTRE[1]})
+
+    def legacy():
+        buffered = io.BytesIO()
+        qrcode.make(payload).save(buffered, format="PNG")
+        return base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+    def current():
+        return base64.b64encode(render_qr(payload, 'png_base64', 10, 4, 'M')).decode('utf-8')
+
+    key = ('microbench', payload)
+    qr_cache.set(key, current())
+    return {
+        'qr.qrcode_make_png_base64': legacy,
+        'qr.render_qr_png_base64': current,
+        'qr.cache_hit': lambda: qr_cache.get(key),
+    }
+
+
+def auth_cases(args, rng):
+    stored = generate_password_hash('correct horse battery staple')
+    print(f"password hash method: {stored.split('$', 1)[0]}")
+    return {
+        'auth.check_password_hash': lambda: check_password_hash(stored, 'correct horse battery staple'),
+    }
+
+
+def json_cases(args, rng):
+    student_rows = students(args.rows, rng)
+    attendance_rows = attendance(args.rows, rng)
+    context = app.app_context()
+    context.push()  # jsonify needs an app context; kept for the whole run
+    return {
+        f'json.jsonify_students_{args.rows}': lambda: jsonify_body({'students': student_rows}),
+        f'json.jsonify_attendance_{args.rows}': lambda: jsonify_body({'attendance': attendance_rows}),
+        f'json.ndjson_students_{args.rows}': lambda: ''.join(ndjson_stream(student_rows)),
+    }
+
+
+def jsonify_body(value):
+    return jsonify(value).get_data()
+
+
+def import_cases(args, rng):
+    data = students_csv(students(args.rows, rng))
+
+    def iterrows():
+        df = pd.read_csv(io.BytesIO(data), dtype=object)
+        return [importer.clean_row(row.to_dict()) for _, row in df.iterrows()]
+
+    def itertuples():
+        df = pd.read_csv(io.BytesIO(data), dtype=object)
+        columns = list(df.columns)
+        return [importer.clean_row(dict(zip(columns, row))) for row in df.itertuples(index=False, name=None)]
+
+    def reader():
+        return [importer.clean_row(row) for _, row in importer.read_csv(data)]
+
+    return {
+        f'import.iterrows_{args.rows}': iterrows,
+        f'import.itertuples_{args.rows}': itertuples,
+        f'import.read_csv_{args.rows}': reader,
+    }
+
+
+GROUPS = {
+    'geo': geo_cases,
+    'qr': qr_cases,
+    'auth': auth_cases,
+    'json': json_cases,
+    'import': import_cases,
+}
+
+
+def measure(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'loops': number,
+        'repeat': repeat,
+        'best_us': round(min(runs) * 1e6, 3),
+        'median_us': round(statistics.median(runs) * 1e6, 3),
+        'ops_per_second': round(1 / statistics.median(runs), 1),
+    }
+
+
+def versions():
+    found = {'python': platform.python_version()}
+    for name in ('flask', 'werkzeug', 'pandas', 'qrcode', 'pillow', 'geopy'):
+        try:
+            found[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            pass
+    return found
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\n{'case':<34} {'base us':>12} {'now us':>12} {'change':>8}")
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        change = (now['median_us'] - before['median_us']) / before['median_us'] if before['median_us'] else 0.0
+        print(f"{name:<34} {before['median_us']:>12} {now['median_us']:>12} {change:>+8.1%}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--only', action='append', choices=sorted(GROUPS),
+                        help='run only this group (can be repeated)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=10000, help='list size for the json and import cases')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='results JSON of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed median slowdown against the baseline (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {}
+    for group in args.only or GROUPS:
+        for name, func in GROUPS[group](args, rng).items():
+            result = results[name] = measure(func, args.repeat)
+            print(f"{name:<34} {result['median_us']:>12} us  best {result['best_us']} us  "
+                  f"{result['ops_per_second']:>12} ops/s")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        if regressions:
+            print(f"regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'platform': platform.platform(),
+                'versions': versions(),
+                'rows': args.rows,
+                'results': results,
+                'regressions': regressions,
+            }, f, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# sentinel so a cached None can be told apart from a miss
+_MISSING = object()
+
+
+# Bounded LRU cache where every entry also carries an expiry.
+# Shared by the per-process caches in app.py (roles, sessions, ...).
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                # expired entries count as a miss and are dropped right away
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    # like get() but leaves the hit/miss counters and the LRU order alone,
+    # for code that updates entries in place
+    def peek(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= time.monotonic():
+                return default
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        # ttl overrides the cache default for this entry only
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# Exact set of marked student ids per live session.
+# Only answers "definitely marked"; a miss means ask the database. A
+# session's set is dropped once its expiry_time (naive local datetime, like
+# the session table) has passed, and the sessions expiring first are evicted
+# when there are more than max_sessions. load() fills a session with every
+# mark the database holds, after which a miss means "not marked" for it.
+class MarkedSet:
+    def __init__(self, max_sessions=1024):
+        self.max_sessions = max_sessions
+        self._sessions = {}  # session_id -> (expiry_time, set of student ids)
+        self._loaded = set()  # sessions whose set holds every mark
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _live(self, session_id, now):
+        entry = self._sessions.get(session_id)
+        if entry is not None and entry[0] <= now:
+            self._drop(session_id)
+            return None
+        return entry
+
+    def _drop(self, session_id):
+        self._sessions.pop(session_id, None)
+        self._loaded.discard(session_id)
+
+    def _add(self, session_id, student_ids, expiry_time, now):
+        entry = self._live(session_id, now)
+        if entry is None:
+            entry = (expiry_time, set())
+            self._sessions[session_id] = entry
+            if len(self._sessions) > self.max_sessions:
+                for key in [key for key, value in self._sessions.items() if value[0] <= now]:
+                    self._drop(key)
+                while len(self._sessions) > self.max_sessions:
+                    self._drop(min(self._sessions, key=lambda key: self._sessions[key][0]))
+        entry[1].update(student_ids)
+
+    def add_many(self, session_id, student_ids, expiry_time):
+        now = datetime.now()
+        if expiry_time <= now:
+            return
+        with self._lock:
+            self._add(session_id, student_ids, expiry_time, now)
+
+    def add(self, session_id, student_id, expiry_time):
+        self.add_many(session_id, (student_id,), expiry_time)
+
+    # every mark of the session as stored in the database; marks added in
+    # the meantime are kept
+    def load(self, session_id, student_ids, expiry_time):
+        now = datetime.now()
+        if expiry_time <= now:
+            return
+        with self._lock:
+            self._add(session_id, student_ids, expiry_time, now)
+            if session_id in self._sessions:
+                self._loaded.add(session_id)
+
+    def loaded(self, session_id):
+        with self._lock:
+            return self._live(session_id, datetime.now()) is not None and session_id in self._loaded
+
+    def contains(self, session_id, student_id):
+        with self._lock:
+            entry = self._live(session_id, datetime.now())
+            if entry is not None and student_id in entry[1]:
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    # forget a whole session, or one student of it
+    def discard(self, session_id, student_id=None):
+        with self._lock:
+            if student_id is None:
+                self._drop(session_id)
+            elif session_id in self._sessions:
+                self._sessions[session_id][1].discard(student_id)
+
+    # forget a student in every session
+    def discard_student(self, student_id):
+        with self._lock:
+            for _, students in self._sessions.values():
+                students.discard(student_id)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._loaded.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'sessions': len(self._sessions),
+                'students': sum(len(students) for _, students in self._sessions.values()),
+                'max_sessions': self.max_sessions,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+            }
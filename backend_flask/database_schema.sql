@@ -9,7 +9,9 @@ CREATE TABLE user (
     email VARCHAR(100) NOT NULL UNIQUE,
     phone VARCHAR(15) NOT NULL,
     password VARCHAR(255) NOT NULL, -- Long enough for hashed passwords
-    role ENUM('ADMIN', 'TEACHER', 'STUDENT') NOT NULL
+    role ENUM('ADMIN', 'TEACHER', 'STUDENT') NOT NULL,
+    INDEX idx_user_role (role),
+    INDEX idx_user_phone (phone)
 );
 
 -- 2. Student Details Table (Links to User table logically if needed, or keeps separate)
@@ -19,7 +21,9 @@ CREATE TABLE student (
     name VARCHAR(50) NOT NULL,
     class VARCHAR(50) NOT NULL,
     email VARCHAR(100) NOT NULL UNIQUE,
-    phone VARCHAR(15) NOT NULL
+    phone VARCHAR(15) NOT NULL,
+    -- keyset pagination of get_student_by_class by id within a class
+    INDEX idx_student_class_id (class, id)
 );
 
 -- 3. Sessions Table (Added Latitude/Longitude for Geofencing)
@@ -32,7 +36,11 @@ CREATE TABLE session (
     class VARCHAR(50) NOT NULL,
     latitude DOUBLE DEFAULT NULL,  -- New Column
     longitude DOUBLE DEFAULT NULL, -- New Column
-    FOREIGN KEY (created_by) REFERENCES user(id) ON DELETE CASCADE
+    FOREIGN KEY (created_by) REFERENCES user(id) ON DELETE CASCADE,
+    -- keyset pagination of get_sessions by id within each filter
+    INDEX idx_session_class_id (class, id),
+    INDEX idx_session_created_by_id (created_by, id),
+    INDEX idx_session_expiry_time (expiry_time)
 );
 
 -- 4. Attendance Table
@@ -42,6 +50,41 @@ CREATE TABLE attendance (
     session_id INT NOT NULL,
     status VARCHAR(10) NOT NULL,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    -- one mark per student and session, lets writes detect duplicates in one statement
+    UNIQUE KEY uq_attendance_student_session (student_id, session_id),
+    -- per session reports / finalize, and a student's records newest first
+    INDEX idx_attendance_session_status (session_id, status),
+    INDEX idx_attendance_student_timestamp (student_id, timestamp),
     FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE,
     FOREIGN KEY (session_id) REFERENCES session(id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- 5. Per-student totals by class and term (term = half year of the
+-- session's expiry_time, e.g. 2026-1 / 2026-2), kept up to date by the
+-- routes that write attendance.
+-- Check / rebuild: flask --app app attendance-summary check|rebuild
+CREATE TABLE student_attendance_summary (
+    student_id INT NOT NULL,
+    class VARCHAR(50) NOT NULL,
+    term VARCHAR(10) NOT NULL,
+    present_count INT NOT NULL DEFAULT 0,
+    absent_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (student_id, class, term),
+    FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE
+);
+
+-- 6. Applied migrations (migrations/NNN_*.sql). This file already contains
+-- every migration up to the last row below; newer ones are applied with
+-- flask --app app db upgrade
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version, name) VALUES
+    (1, '001_attendance_unique_student_session'),
+    (2, '002_session_listing_indexes'),
+    (3, '003_student_attendance_summary'),
+    (4, '004_student_listing_index'),
+    (5, '005_hot_lookup_indexes');
@@ -0,0 +1,280 @@
+import threading
+import time
+from collections import deque
+
+import MySQLdb
+import MySQLdb.connections
+from flask import g
+
+
+# raised when no connection became free within the wait timeout; it is a
+# MySQLdb error so the routes' existing error handling answers with a 500
+class PoolTimeout(MySQLdb.OperationalError):
+    pass
+
+
+# Connection that reports how long each statement took. Every cursor class
+# (buffered or server-side, execute or executemany) sends its SQL through
+# query(), so this sees all statements without wrapping cursors.
+class TimedConnection(MySQLdb.connections.Connection):
+    observer = None  # called with the seconds each statement took
+
+    def query(self, query):
+        if self.observer is None:
+            return super().query(query)
+        start = time.perf_counter()
+        try:
+            return super().query(query)
+        finally:
+            self.observer(time.perf_counter() - start)
+
+
+# Bounded pool of MySQL connections.
+# Idle connections are reused newest first, recycled once they are too old
+# or have been idle too long, and pinged before reuse if they sat idle for
+# a while. When every connection is in use, acquire() waits up to
+# wait_timeout seconds for one to come back.
+class ConnectionPool:
+    def __init__(self, connect, maxsize=10, wait_timeout=5.0, idle_timeout=300.0,
+                 max_lifetime=3600.0, ping_after=30.0):
+        self._connect = connect
+        self.maxsize = maxsize
+        self.wait_timeout = wait_timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._idle = deque()  # (connection, created_at, last_used)
+        self._created_at = {}  # id(connection) -> created_at, for checked out ones
+        self._in_use = 0
+        self._cond = threading.Condition()
+        # counters for the gauges in stats()
+        self.created_total = 0
+        self.closed_total = 0
+        self.checkouts_total = 0
+        self.waits_total = 0
+        self.timeouts_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _close(self, conn):
+        self.closed_total += 1
+        try:
+            conn.close()
+        except MySQLdb.Error:
+            pass
+
+    # drop idle connections past their idle timeout or lifetime (oldest are on the left)
+    def _recycle(self, now):
+        while self._idle:
+            conn, created_at, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout and now - created_at < self.max_lifetime:
+                break
+            self._idle.popleft()
+            self._close(conn)
+
+    def acquire(self):
+        start = time.monotonic()
+        entry = None
+        waited = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._recycle(now)
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._in_use < self.maxsize:
+                    break
+                remaining = self.wait_timeout - (now - start)
+                if remaining <= 0:
+                    self.timeouts_total += 1
+                    raise PoolTimeout(2013, f'No database connection available within {self.wait_timeout}s.')
+                waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self.checkouts_total += 1
+            if waited:
+                waited_for = time.monotonic() - start
+                self.waits_total += 1
+                self.wait_seconds_total += waited_for
+                self.wait_seconds_max = max(self.wait_seconds_max, waited_for)
+
+        try:
+            if entry is not None:
+                conn, created_at, last_used = entry
+                if time.monotonic() - last_used >= self.ping_after:
+                    # health check, a broken connection is replaced by a new one
+                    try:
+                        conn.ping()
+                    except MySQLdb.Error:
+                        with self._cond:
+                            self._close(conn)
+                        entry = None
+            if entry is None:
+                conn = self._connect()
+                created_at = time.monotonic()
+                with self._cond:
+                    self.created_total += 1
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created_at[id(conn)] = created_at
+        return conn
+
+    # give a connection back; an open transaction is rolled back so the next
+    # user does not inherit it (or its snapshot)
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                conn.rollback()
+            except MySQLdb.Error:
+                discard = True
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), time.monotonic())
+            self._in_use -= 1
+            if discard:
+                self._close(conn)
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._close(self._idle.pop()[0])
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.maxsize,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'created_total': self.created_total,
+                'closed_total': self.closed_total,
+                'checkouts_total': self.checkouts_total,
+                'waits_total': self.waits_total,
+                'wait_timeouts_total': self.timeouts_total,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+            }
+
+
+# Drop-in replacement for flask_mysqldb.MySQL: `mysql.connection` checks a
+# connection out of the pool for the current app context and the context's
+# teardown gives it back. MYSQL_POOL_SIZE = 0 turns pooling off (a new
+# connection per app context, like flask_mysqldb), which benchmarks use.
+# on_query, when set, is called with the duration of every statement.
+class PooledMySQL:
+    backend = 'mysql'
+
+    def __init__(self, app=None):
+        self.app = None
+        self.pool = None
+        self.on_query = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8mb4')
+        app.config.setdefault('MYSQL_CONNECT_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_POOL_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_WAIT_TIMEOUT', 5)
+        app.config.setdefault('MYSQL_POOL_IDLE_TIMEOUT', 300)
+        app.config.setdefault('MYSQL_POOL_MAX_LIFETIME', 3600)
+        app.config.setdefault('MYSQL_POOL_PING_AFTER', 30)
+        app.teardown_appcontext(self.teardown)
+
+    def connect(self):
+        config = self.app.config
+        kwargs = {
+            'host': config['MYSQL_HOST'],
+            'port': config['MYSQL_PORT'],
+            'charset': config['MYSQL_CHARSET'],
+            'connect_timeout': config['MYSQL_CONNECT_TIMEOUT'],
+        }
+        if config['MYSQL_USER']:
+            kwargs['user'] = config['MYSQL_USER']
+        if config['MYSQL_PASSWORD']:
+            kwargs['passwd'] = config['MYSQL_PASSWORD']
+        if config['MYSQL_DB']:
+            kwargs['db'] = config['MYSQL_DB']
+        conn = TimedConnection(**kwargs)
+        conn.observer = self._observe
+        return conn
+
+    def _observe(self, seconds):
+        if self.on_query is not None:
+            self.on_query(seconds)
+
+    # the pool is built on first use so config set after init_app applies
+    def _get_pool(self):
+        if self.pool is None:
+            with self._lock:
+                if self.pool is None:
+                    config = self.app.config
+                    self.pool = ConnectionPool(
+                        self.connect,
+                        maxsize=config['MYSQL_POOL_SIZE'],
+                        wait_timeout=config['MYSQL_POOL_WAIT_TIMEOUT'],
+                        idle_timeout=config['MYSQL_POOL_IDLE_TIMEOUT'],
+                        max_lifetime=config['MYSQL_POOL_MAX_LIFETIME'],
+                        ping_after=config['MYSQL_POOL_PING_AFTER'],
+                    )
+        return self.pool
+
+    def _pooled(self):
+        return self.app.config['MYSQL_POOL_SIZE'] > 0
+
+    def acquire(self):
+        return self._get_pool().acquire() if self._pooled() else self.connect()
+
+    def release(self, conn, discard=False):
+        if self._pooled():
+            self._get_pool().release(conn, discard=discard)
+        else:
+            try:
+                conn.close()
+            except MySQLdb.Error:
+                pass
+
+    @property
+    def connection(self):
+        conn = g.get('_mysql_connection')
+        if conn is None:
+            conn = self.acquire()
+            g._mysql_connection = conn
+        return conn
+
+    # take the context's connection out of the teardown, for responses that
+    # keep reading from it after the view returned; pass it to release() later
+    def detach(self):
+        conn = self.connection
+        g.pop('_mysql_connection', None)
+        return conn
+
+    def teardown(self, exception):
+        conn = g.pop('_mysql_connection', None)
+        if conn is not None:
+            self.release(conn)
+
+    # close the pool; the next use builds a new one from the current config
+    def reset(self):
+        with self._lock:
+            if self.pool is not None:
+                self.pool.close_all()
+            self.pool = None
+
+    def stats(self):
+        if not self._pooled():
+            return {'max_size': 0}
+        return self._get_pool().stats()
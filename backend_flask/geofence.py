@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+
+# WGS84 ellipsoid, the same one geopy's geodesic uses
+WGS84_A = 6378.137  # semi-major axis in km
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+# Points whose projected distance is within this fraction of the radius from
+# the boundary are re-checked with the haversine formula
+BOUNDARY_MARGIN = 0.01
+
+
+# radii of curvature (meridian, prime vertical) of the ellipsoid at a latitude
+def _curvature_radii(lat):
+    sin_lat = math.sin(math.radians(lat))
+    w = math.sqrt(1 - WGS84_E2 * sin_lat * sin_lat)
+    meridian = WGS84_A * (1 - WGS84_E2) / (w ** 3)
+    prime_vertical = WGS84_A / w
+    return meridian, prime_vertical
+
+
+# great-circle distance in km on a sphere of the given radius
+def haversine_km(lat1, lng1, lat2, lng2, radius_km=6371.0088):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * radius_km * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _wrap_lng(dlng):
+    return (dlng + 180.0) % 360.0 - 180.0
+
+
+# Circular geofence around a session location.
+# Everything that depends only on the centre (bounding box, local
+# equirectangular projection scale, curvature radii) is computed once, so a
+# check costs a few multiplications for almost every point.
+class Geofence:
+    def __init__(self, lat, lng, radius_km):
+        self.lat = float(lat)
+        self.lng = float(lng)
+        self.radius_km = float(radius_km)
+
+        meridian, prime_vertical = _curvature_radii(self.lat)
+        self._meridian = meridian
+        self._prime_vertical = prime_vertical
+        # km per degree of latitude / longitude around the centre
+        self._km_per_deg_lat = math.radians(1) * meridian
+        self._km_per_deg_lng = math.radians(1) * prime_vertical * math.cos(math.radians(self.lat))
+
+        # bounding box (with the margin) used to reject far away points outright
+        reach = self.radius_km * (1 + BOUNDARY_MARGIN)
+        self.dlat = reach / self._km_per_deg_lat
+        if self._km_per_deg_lng > reach / 180.0:
+            self.dlng = min(180.0, reach / self._km_per_deg_lng)
+        else:
+            self.dlng = 180.0  # at the poles every longitude is close
+        self.min_lat = self.lat - self.dlat
+        self.max_lat = self.lat + self.dlat
+
+        self._inner_sq = (self.radius_km * (1 - BOUNDARY_MARGIN)) ** 2
+        self._outer_sq = (self.radius_km * (1 + BOUNDARY_MARGIN)) ** 2
+
+    # haversine on a sphere whose radius is the ellipsoid's curvature in the
+    # direction of the point, which keeps it within millimetres of geodesic
+    # at geofence scale
+    def _boundary_distance_km(self, lat, lng, x, y):
+        d2 = x * x + y * y
+        if d2 == 0:
+            return 0.0
+        cos2 = (y * y) / d2
+        sin2 = (x * x) / d2
+        radius = 1.0 / (cos2 / self._meridian + sin2 / self._prime_vertical)
+        return haversine_km(self.lat, self.lng, lat, lng, radius)
+
+    # local projected distance in km (accurate for short distances)
+    def distance_km(self, lat, lng):
+        x = _wrap_lng(lng - self.lng) * self._km_per_deg_lng
+        y = (lat - self.lat) * self._km_per_deg_lat
+        return math.hypot(x, y)
+
+    def contains(self, lat, lng):
+        if lat < self.min_lat or lat > self.max_lat:
+            return False
+        dlng = _wrap_lng(lng - self.lng)
+        if abs(dlng) > self.dlng:
+            return False
+        x = dlng * self._km_per_deg_lng
+        y = (lat - self.lat) * self._km_per_deg_lat
+        d2 = x * x + y * y
+        if d2 <= self._inner_sq:
+            return True
+        if d2 > self._outer_sq:
+            return False
+        return self._boundary_distance_km(lat, lng, x, y) <= self.radius_km
+
+    # vectorized check of many points, returns a boolean numpy array
+    def contains_many(self, lats, lngs):
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        dlng = (lngs - self.lng + 180.0) % 360.0 - 180.0
+        x = dlng * self._km_per_deg_lng
+        y = (lats - self.lat) * self._km_per_deg_lat
+        d2 = x * x + y * y
+
+        inside = (d2 <= self._inner_sq)
+        in_box = (lats >= self.min_lat) & (lats <= self.max_lat) & (np.abs(dlng) <= self.dlng)
+        inside &= in_box
+        band = in_box & (d2 > self._inner_sq) & (d2 <= self._outer_sq)
+        if band.any():
+            bx = x[band]
+            by = y[band]
+            bd2 = bx * bx + by * by
+            radius = 1.0 / ((by * by / bd2) / self._meridian + (bx * bx / bd2) / self._prime_vertical)
+            phi1 = math.radians(self.lat)
+            phi2 = np.radians(lats[band])
+            dphi = phi2 - phi1
+            dlmb = np.radians(dlng[band])
+            h = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+            distance = 2 * radius * np.arcsin(np.minimum(1.0, np.sqrt(h)))
+            inside[band] = distance <= self.radius_km
+        return inside
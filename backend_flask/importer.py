@@ -0,0 +1,249 @@
+import csv
+import io
+import time
+
+import MySQLdb
+
+# Streaming student roster import used by /import_students.
+# Rows are read chunk by chunk straight from the uploaded bytes (no temp
+# file), existing ids are found with one IN (...) lookup per chunk and new
+# students are inserted in bounded multi-row batches, committed per batch.
+
+REQUIRED_COLUMNS = ('id', 'name', 'class', 'email', 'phone')
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv', 'parquet'}
+READ_CHUNK_SIZE = 1000
+INSERT_BATCH_SIZE = 500
+MAX_REPORTED_REJECTS = 1000
+
+
+# raised for unreadable files or files without the required columns
+class ImportFileError(ValueError):
+    pass
+
+
+def _header_index(header):
+    names = [str(name).strip().lower() if name is not None else '' for name in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in names]
+    if missing:
+        raise ImportFileError(f'File must contain the following columns: {", ".join(REQUIRED_COLUMNS)}')
+    return {column: names.index(column) for column in REQUIRED_COLUMNS}
+
+
+# readers yield (row_number, {column: value}); row_number is the line in the
+# file as a user would see it (header is row 1)
+def read_xlsx(data):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Reading .xlsx files requires the openpyxl package.')
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        index = _header_index(next(rows, ()))
+        for row_number, row in enumerate(rows, start=2):
+            if row is None or all(value is None for value in row):
+                continue
+            yield row_number, {column: row[i] if i < len(row) else None for column, i in index.items()}
+    finally:
+        workbook.close()
+
+
+def read_xls(data):
+    # legacy format, openpyxl cannot read it; these sheets are at most 65k rows
+    import pandas as pd
+    df = pd.read_excel(io.BytesIO(data), dtype=object)
+    index = _header_index(df.columns)
+    for row_number, row in enumerate(df.itertuples(index=False, name=None), start=2):
+        yield row_number, {column: row[i] for column, i in index.items()}
+
+
+def read_csv(data):
+    text = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    index = _header_index(next(reader, ()))
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        yield reader.line_num, {column: row[i] if i < len(row) else None for column, i in index.items()}
+
+
+def read_parquet(data):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportFileError('Reading .parquet files requires the pyarrow package.')
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    names = {name.strip().lower(): name for name in parquet_file.schema_arrow.names}
+    _header_index(names.keys())
+    columns = [names[column] for column in REQUIRED_COLUMNS]
+    row_number = 1
+    for batch in parquet_file.iter_batches(batch_size=READ_CHUNK_SIZE, columns=columns):
+        for record in batch.to_pylist():
+            row_number += 1
+            yield row_number, {column: record[names[column]] for column in REQUIRED_COLUMNS}
+
+
+READERS = {
+    'xlsx': read_xlsx,
+    'xls': read_xls,
+    'csv': read_csv,
+    'parquet': read_parquet,
+}
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:  # NaN from pandas
+            return None
+        if value.is_integer():
+            value = int(value)  # phone numbers typed into a numeric cell
+    value = str(value).strip()
+    return value or None
+
+
+# returns (clean row, None) or (None, reason)
+def clean_row(row):
+    values = {column: _text(row.get(column)) for column in REQUIRED_COLUMNS}
+    missing = [column for column, value in values.items() if value is None]
+    if missing:
+        return None, f'missing {", ".join(missing)}'
+    try:
+        student_id = float(values['id'])
+        if not student_id.is_integer():
+            raise ValueError
+        values['id'] = int(student_id)
+    except ValueError:
+        return None, 'id must be an integer'
+    return values, None
+
+
+# wraps a reader so that parse errors surface as ImportFileError
+def _read(reader, data):
+    try:
+        yield from reader(data)
+    except ImportFileError:
+        raise
+    except Exception as e:
+        # zip/xlsx, parquet and csv decoding errors all end up here
+        raise ImportFileError(f'Could not read the file: {e}')
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.rejects = []
+        self.started = time.perf_counter()
+
+    def reject(self, row_number, reason):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({'row': row_number, 'reason': reason})
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'rows_read': self.rows,
+            'student_count': self.imported,
+            'skipped_existing': self.skipped,
+            'rejected_count': self.rejected,
+            'rejects': self.rejects,
+            'rejects_truncated': self.rejected > len(self.rejects),
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.rows / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+def _existing(cur, column, values):
+    if not values:
+        return set()
+    placeholders = ', '.join(['%s'] * len(values))
+    cur.execute(f"SELECT {column} FROM student WHERE {column} IN ({placeholders})", list(values))
+    return {row[0] for row in cur.fetchall()}
+
+
+INSERT_STUDENT = "INSERT INTO student (id, name, class, email, phone) VALUES (%s, %s, %s, %s, %s)"
+
+
+def _insert_batch(connection, cur, batch, report):
+    try:
+        cur.executemany(INSERT_STUDENT, [row[1] for row in batch])
+        connection.commit()
+        report.imported += len(batch)
+    except MySQLdb.IntegrityError:
+        # someone else inserted one of these ids/emails since the lookup,
+        # redo the batch row by row so only the conflicting rows are rejected
+        connection.rollback()
+        for row_number, values in batch:
+            try:
+                cur.execute(INSERT_STUDENT, values)
+                report.imported += 1
+            except MySQLdb.IntegrityError:
+                report.reject(row_number, 'id or email already exists')
+        connection.commit()
+
+
+# import every row of an uploaded file, returns the ImportReport
+# progress(report) is called after every chunk, exceptions it raises (for
+# example a job cancellation) stop the import after the last committed batch
+def import_students(connection, data, extension, progress=None):
+    reader = READERS.get(extension)
+    if reader is None:
+        raise ImportFileError(f'Invalid file type. Allowed: {", ".join(sorted(ALLOWED_EXTENSIONS))}.')
+    report = ImportReport()
+    seen_ids = set()
+    seen_emails = set()
+    cur = connection.cursor()
+    try:
+        for chunk in _chunks(_read(reader, data), READ_CHUNK_SIZE):
+            candidates = []
+            for row_number, row in chunk:
+                report.rows += 1
+                values, reason = clean_row(row)
+                if reason:
+                    report.reject(row_number, reason)
+                elif values['id'] in seen_ids:
+                    report.reject(row_number, 'duplicate id in file')
+                elif values['email'].lower() in seen_emails:
+                    report.reject(row_number, 'duplicate email in file')
+                else:
+                    seen_ids.add(values['id'])
+                    seen_emails.add(values['email'].lower())
+                    candidates.append((row_number, values))
+
+            # set-based lookups for the whole chunk
+            existing_ids = _existing(cur, 'id', [values['id'] for _, values in candidates])
+            existing_emails = {email.lower() for email in _existing(
+                cur, 'email', [values['email'] for _, values in candidates if values['id'] not in existing_ids])}
+
+            new_rows = []
+            for row_number, values in candidates:
+                if values['id'] in existing_ids:
+                    report.skipped += 1  # skip if student already exists
+                elif values['email'].lower() in existing_emails:
+                    report.reject(row_number, 'email already in use')
+                else:
+                    new_rows.append((row_number, (values['id'], values['name'], values['class'],
+                                                  values['email'], values['phone'])))
+            for batch in _chunks(new_rows, INSERT_BATCH_SIZE):
+                _insert_batch(connection, cur, batch, report)
+            if progress:
+                progress(report)
+    finally:
+        cur.close()
+    return report
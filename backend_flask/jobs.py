@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# In-process background jobs for long running work (large imports, bulk
+# operations). A bounded pool runs the jobs, every job gets an id that can
+# be polled for progress, cancelled, and its final state is written to disk
+# so results survive a restart.
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+# raised inside a job function when the job was cancelled
+class JobCancelled(Exception):
+    pass
+
+
+# raised by submit() when all workers are busy and the queue is full
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind, owner=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = 'queued'  # queued, running, succeeded, failed, cancelled
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    # called by the job function to publish progress (any JSON values)
+    def update(self, **progress):
+        self.progress.update(progress)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    # job functions call this between units of work
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def as_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'owner': self.owner,
+            'status': self.status,
+            'cancel_requested': self.cancelled,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(self, workers=2, max_queued=8, results_dir='job_results', keep_in_memory=200):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.results_dir = results_dir
+        self.keep_in_memory = keep_in_memory
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        # running + queued jobs are bounded, extra submissions are refused
+        self._slots = threading.BoundedSemaphore(workers + max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # run func(job, *args) in the pool, returns the Job right away
+    def submit(self, kind, func, *args, owner=None):
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull()
+        job = Job(kind, owner)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def _run(self, job, func, args):
+        try:
+            if job.cancelled:
+                job.status = 'cancelled'
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+            job.result = func(job, *args)
+            job.status = 'succeeded'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+            try:
+                self._persist(job)
+            except OSError:
+                pass
+
+    def _path(self, job_id):
+        return os.path.join(self.results_dir, f'{job_id}.json')
+
+    # the results directory is created with the first finished job
+    def _persist(self, job):
+        os.makedirs(self.results_dir, exist_ok=True)
+        path = self._path(job.id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(job.as_dict(), f, default=str)
+        os.replace(tmp_path, path)
+
+    # forget the oldest finished jobs, they can still be read back from disk
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        if len(self._jobs) <= self.keep_in_memory or not finished:
+            return
+        finished.sort(key=lambda job: job.finished_at)
+        for job in finished[:len(self._jobs) - self.keep_in_memory]:
+            del self._jobs[job.id]
+
+    # returns the job state as a dict, or None for unknown ids
+    def get(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.as_dict()
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # returns False if the job is unknown or already finished
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.finished_at is not None:
+            return False
+        job.cancel()
+        return True
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {'workers': self.workers, 'max_queued': self.max_queued, 'jobs': counts}
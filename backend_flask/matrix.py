@@ -0,0 +1,115 @@
+import threading
+
+import pandas as pd
+
+# columns of the frame a ClassMatrix is built from, one row per
+# (student, session) pair plus one row per session with a NULL student so
+# sessions of a class without students still show up
+MATRIX_COLUMNS = ['student_id', 'student_name', 'session_id', 'session_name', 'expiry_time', 'status']
+
+
+# Students x sessions attendance register of one class.
+# Built once from the query rows with a pivot, then kept current in place by
+# the mark / finalize / delete routes, so a cached register does not have to
+# be rebuilt on every scan. Cells hold 'PRESENT', 'ABSENT' or None (no record).
+class ClassMatrix:
+    def __init__(self, class_name, frame):
+        self.class_name = class_name
+        self._lock = threading.Lock()
+        self._rendered = None
+        frame = frame.astype({'student_id': 'Int64', 'session_id': 'Int64'})
+        students = (frame.dropna(subset=['student_id'])
+                    .drop_duplicates('student_id')
+                    .set_index('student_id')['student_name']
+                    .sort_index())
+        sessions = (frame.dropna(subset=['session_id'])
+                    .drop_duplicates('session_id')
+                    .sort_values(['expiry_time', 'session_id'])
+                    .set_index('session_id')[['session_name', 'expiry_time']])
+        cells = frame.dropna(subset=['student_id', 'session_id'])
+        statuses = cells.pivot(index='student_id', columns='session_id', values='status')
+        self.students = students
+        self.sessions = sessions
+        self.statuses = statuses.reindex(index=students.index, columns=sessions.index).astype(object)
+
+    # record new marks [(student_id, session_id, status)]; a cell that already
+    # has a record keeps it (the first mark wins, like the unique key), pairs
+    # outside the register are ignored
+    def set_statuses(self, marks):
+        with self._lock:
+            for student_id, session_id, status in marks:
+                if student_id in self.statuses.index and session_id in self.statuses.columns:
+                    if pd.isna(self.statuses.at[student_id, session_id]):
+                        self.statuses.at[student_id, session_id] = status
+                        self._rendered = None
+
+    # finalize: every student without a record for the session gets `status`
+    def fill_session(self, session_id, status='ABSENT'):
+        with self._lock:
+            if session_id in self.statuses.columns:
+                self.statuses[session_id] = self.statuses[session_id].where(self.statuses[session_id].notna(), status)
+                self._rendered = None
+
+    def clear_student(self, student_id):
+        with self._lock:
+            if student_id in self.statuses.index:
+                self.statuses.loc[student_id] = None
+                self._rendered = None
+
+    def clear_session(self, session_id):
+        with self._lock:
+            if session_id in self.statuses.columns:
+                self.statuses[session_id] = None
+                self._rendered = None
+
+    # the register as JSON-ready dict; totals are computed column/row wise
+    # over the whole frame and the result is kept until the next change
+    def as_dict(self):
+        with self._lock:
+            if self._rendered is None:
+                self._rendered = self._render()
+            return self._rendered
+
+    def _render(self):
+        statuses = self.statuses
+        present = statuses.eq('PRESENT')
+        absent = statuses.eq('ABSENT')
+        unmarked = statuses.isna()
+        student_present = present.sum(axis=1)
+        student_absent = absent.sum(axis=1)
+        student_unmarked = unmarked.sum(axis=1)
+        session_present = present.sum(axis=0)
+        session_absent = absent.sum(axis=0)
+        session_unmarked = unmarked.sum(axis=0)
+        session_count = len(statuses.columns)
+        cells = statuses.where(statuses.notna(), None).values.tolist()
+
+        sessions = [{
+            'session_id': int(session_id),
+            'session_name': row.session_name,
+            'expiry_time': row.expiry_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'present_count': int(session_present[session_id]),
+            'absent_count': int(session_absent[session_id]),
+            'unmarked_count': int(session_unmarked[session_id]),
+        } for session_id, row in zip(self.sessions.index, self.sessions.itertuples())]
+        students = [{
+            'student_id': int(student_id),
+            'name': name,
+            'statuses': row,
+            'present_count': int(student_present[student_id]),
+            'absent_count': int(student_absent[student_id]),
+            'unmarked_count': int(student_unmarked[student_id]),
+            'attendance_rate': round(int(student_present[student_id]) / session_count, 4) if session_count else None,
+        } for student_id, name, row in zip(self.students.index, self.students.values, cells)]
+        return {
+            'class': self.class_name,
+            'student_count': len(students),
+            'session_count': session_count,
+            'sessions': sessions,
+            'students': students,
+            'totals': {
+                'present_count': int(present.values.sum()),
+                'absent_count': int(absent.values.sum()),
+                'unmarked_count': int(unmarked.values.sum()),
+            },
+        }
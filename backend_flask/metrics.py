@@ -0,0 +1,133 @@
+import threading
+
+# Minimal Prometheus metrics (text exposition format 0.0.4) for /metrics.
+# Counters and histograms are updated in process by the request hooks in
+# app.py; callback metrics read gauges (pool, caches, buffers) at scrape
+# time. Every metric is keyed by a tuple of label values.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# request latencies, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labelvalues=(), amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            yield f'{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labelvalues -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labelvalues=()):
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[index] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def lines(self):
+        with self._lock:
+            values = sorted((key, list(entry)) for key, entry in self._values.items())
+        for labelvalues, entry in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}'
+            yield f'{self.name}_bucket{_labels(self.labelnames, labelvalues, INF_LABEL)} {entry[-1]}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(entry[-2])}'
+            yield f'{self.name}_count{_labels(self.labelnames, labelvalues)} {entry[-1]}'
+
+
+# value(s) read from a callback at scrape time; the callback returns a
+# number, or an iterable of (labelvalues, number) when there are labels
+class CallbackMetric:
+    def __init__(self, name, help, func, labelnames=(), kind='gauge'):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def lines(self):
+        values = self.func()
+        if not self.labelnames:
+            values = [((), values)]
+        for labelvalues, value in values:
+            yield f'{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, func, labelnames=(), kind='gauge'):
+        return self.register(CallbackMetric(name, help, func, labelnames, kind))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.lines())
+        return '\n'.join(lines) + '\n'
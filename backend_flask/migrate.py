@@ -0,0 +1,135 @@
+import os
+import re
+
+# Forward-only schema migrations.
+# migrations/NNN_name.sql files are applied in version order, each one
+# recorded in schema_migrations once all of its statements ran. There are no
+# down migrations: a change is undone by a newer migration. MySQL commits DDL
+# implicitly, so a migration that fails half way has to be finished by hand
+# (or made re-runnable) before upgrading again.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+FILENAME = re.compile(r'^(\d+)_[\w-]+\.sql$')
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def statements(self):
+        with open(self.path, encoding='utf-8') as f:
+            return split_statements(f.read())
+
+
+# [Migration] sorted by version; two files with the same number is an error
+def discover(directory=MIGRATIONS_DIR):
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f'Duplicate migration version {version}: '
+                                 f'{migrations[version].name} and {filename}')
+        migrations[version] = Migration(version, filename[:-len('.sql')], os.path.join(directory, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+# split a script on the semicolons outside of quotes and comments
+def split_statements(sql):
+    statements = []
+    current = []
+    quote = None
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if quote:
+            current.append(char)
+            if char == '\\':
+                current.append(sql[i + 1:i + 2])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in ("'", '"', '`'):
+            quote = char
+            current.append(char)
+        elif sql.startswith('--', i) or char == '#':
+            end = sql.find('\n', i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = len(sql) if end == -1 else end + 2
+            continue
+        elif char == ';':
+            statements.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statements.append(''.join(current).strip())
+    return [statement for statement in statements if statement]
+
+
+# {version: name} of the migrations recorded in the database
+def applied(cur):
+    cur.execute(MIGRATIONS_TABLE)
+    cur.execute("SELECT version, name FROM schema_migrations ORDER BY version")
+    return dict(cur.fetchall())
+
+
+def pending(cur, migrations):
+    done = applied(cur)
+    newest = max(done, default=0)
+    missed = [migration.name for migration in migrations if migration.version < newest and migration.version not in done]
+    if missed:
+        # forward-only: a migration numbered below the newest applied one
+        # would run out of order
+        raise MigrationError(f'Migrations older than version {newest} were never applied: {", ".join(missed)}')
+    return [migration for migration in migrations if migration.version not in done]
+
+
+def apply(connection, migration):
+    cur = connection.cursor()
+    try:
+        for statement in migration.statements():
+            cur.execute(statement)
+        cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+# record migrations up to `version` as applied without running them, for
+# databases that were created from database_schema.sql or migrated by hand
+def baseline(connection, migrations, version):
+    cur = connection.cursor()
+    try:
+        done = applied(cur)
+        marked = [migration for migration in migrations if migration.version <= version and migration.version not in done]
+        cur.executemany("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        [(migration.version, migration.name) for migration in marked])
+        connection.commit()
+        return marked
+    finally:
+        cur.close()
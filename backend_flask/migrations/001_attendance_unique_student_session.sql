@@ -0,0 +1,13 @@
+-- Enforce one attendance row per (student_id, session_id).
+-- Existing duplicates are removed first, keeping the earliest row of each pair.
+-- Run against an existing database:  mysql attendance_app < migrations/001_attendance_unique_student_session.sql
+
+DELETE newer
+FROM attendance newer
+JOIN attendance older
+    ON older.student_id = newer.student_id
+    AND older.session_id = newer.session_id
+    AND older.id < newer.id;
+
+ALTER TABLE attendance
+    ADD UNIQUE KEY uq_attendance_student_session (student_id, session_id);
@@ -0,0 +1,8 @@
+-- Indexes behind the filters of get_sessions.
+-- class / created_by lookups are followed by "id > after_id ORDER BY id",
+-- so those indexes end in id and a page is a single range read.
+
+ALTER TABLE session
+    ADD INDEX idx_session_class_id (class, id),
+    ADD INDEX idx_session_created_by_id (created_by, id),
+    ADD INDEX idx_session_expiry_time (expiry_time);
@@ -0,0 +1,24 @@
+-- Per-student attendance totals by class and term, read by attendance_report
+-- instead of aggregating the student's whole history on every call.
+-- The term is the half year of the session's expiry_time ('2026-1' for
+-- January to June, '2026-2' for July to December).
+-- Run against an existing database:  mysql attendance_app < migrations/003_student_attendance_summary.sql
+
+CREATE TABLE student_attendance_summary (
+    student_id INT NOT NULL,
+    class VARCHAR(50) NOT NULL,
+    term VARCHAR(10) NOT NULL,
+    present_count INT NOT NULL DEFAULT 0,
+    absent_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (student_id, class, term),
+    FOREIGN KEY (student_id) REFERENCES student(id) ON DELETE CASCADE
+);
+
+-- backfill from the existing attendance rows
+INSERT INTO student_attendance_summary (student_id, class, term, present_count, absent_count)
+SELECT a.student_id, s.class,
+       CONCAT(YEAR(s.expiry_time), IF(MONTH(s.expiry_time) <= 6, '-1', '-2')) AS term,
+       SUM(a.status = 'PRESENT'), SUM(a.status = 'ABSENT')
+FROM attendance a
+JOIN session s ON s.id = a.session_id
+GROUP BY a.student_id, s.class, term;
@@ -0,0 +1,6 @@
+-- Index behind get_student_by_class.
+-- "class = ? AND id > after_id ORDER BY id LIMIT n" becomes a single range
+-- read instead of a full scan plus sort of the student table.
+
+ALTER TABLE student
+    ADD INDEX idx_student_class_id (class, id);
@@ -0,0 +1,17 @@
+-- Indexes behind the remaining per-request lookups.
+-- attendance by session (session reports, finalize, delete_session): the
+-- status column lets the present / absent counts be read from the index.
+-- attendance by student newest first (attendance_report pages): the
+-- primary key is appended by InnoDB, so "ORDER BY timestamp DESC, id DESC"
+-- needs no sort.
+-- user by role (get_teachers) and by phone (add_teacher duplicate check).
+-- student by class and session by created_by are covered by
+-- idx_student_class_id (004) and idx_session_created_by_id (002).
+
+ALTER TABLE attendance
+    ADD INDEX idx_attendance_session_status (session_id, status),
+    ADD INDEX idx_attendance_student_timestamp (student_id, timestamp);
+
+ALTER TABLE user
+    ADD INDEX idx_user_role (role),
+    ADD INDEX idx_user_phone (phone);
@@ -0,0 +1,83 @@
+import heapq
+import threading
+from datetime import datetime
+
+# Runs a callback for each session once its expiry_time has passed.
+# Upcoming expiries are kept in a min-heap and a single thread sleeps until
+# the earliest one, so nothing polls the session table.
+
+# upper bound for one sleep, keeps the thread responsive to clock changes
+MAX_SLEEP_SECONDS = 60
+
+
+class ExpiryScheduler:
+    def __init__(self, callback, logger=None):
+        self.callback = callback
+        self.logger = logger
+        self._heap = []  # (expiry_time, session_id)
+        # latest expiry per session; heap entries that do not match it are
+        # stale (cancelled or rescheduled) and skipped when popped
+        self._scheduled = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def schedule(self, session_id, expiry_time):
+        with self._cond:
+            self._scheduled[session_id] = expiry_time
+            heapq.heappush(self._heap, (expiry_time, session_id))
+            self._cond.notify()
+
+    def cancel(self, session_id):
+        with self._cond:
+            self._scheduled.pop(session_id, None)
+
+    def pending(self):
+        with self._cond:
+            return len(self._scheduled)
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='expiry-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _next_due(self):
+        # returns the next due session id, or None when stopped
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                expiry_time, session_id = self._heap[0]
+                delay = (expiry_time - datetime.now()).total_seconds()
+                if delay > 0:
+                    self._cond.wait(timeout=min(delay, MAX_SLEEP_SECONDS))
+                    continue
+                heapq.heappop(self._heap)
+                if self._scheduled.get(session_id) != expiry_time:
+                    continue
+                del self._scheduled[session_id]
+                return session_id
+            return None
+
+    def _run(self):
+        while True:
+            session_id = self._next_due()
+            if session_id is None:
+                return
+            try:
+                self.callback(session_id)
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Expiry callback failed for session {session_id}: {e}")
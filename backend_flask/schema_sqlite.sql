@@ -0,0 +1,64 @@
+-- Schema of the embedded SQLite backend (DATABASE_BACKEND = 'sqlite').
+-- Same tables and indexes as database_schema.sql at its newest migration;
+-- storage.SQLiteDatabase runs this script when it opens an empty file.
+-- Text columns the MySQL schema compares case-insensitively (its default
+-- collation) are declared COLLATE NOCASE.
+
+-- 1. Users Table (Admin, Teacher, Student roles)
+CREATE TABLE IF NOT EXISTS user (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(50) NOT NULL,
+    email VARCHAR(100) NOT NULL UNIQUE COLLATE NOCASE,
+    phone VARCHAR(15) NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('ADMIN', 'TEACHER', 'STUDENT'))
+);
+CREATE INDEX IF NOT EXISTS idx_user_role ON user (role);
+CREATE INDEX IF NOT EXISTS idx_user_phone ON user (phone);
+
+-- 2. Student Details Table
+CREATE TABLE IF NOT EXISTS student (
+    id INTEGER PRIMARY KEY, -- Manual ID (e.g., Roll Number)
+    name VARCHAR(50) NOT NULL,
+    class VARCHAR(50) NOT NULL COLLATE NOCASE,
+    email VARCHAR(100) NOT NULL UNIQUE COLLATE NOCASE,
+    phone VARCHAR(15) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_student_class_id ON student (class, id);
+
+-- 3. Sessions Table
+CREATE TABLE IF NOT EXISTS session (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_name VARCHAR(100) NOT NULL,
+    session_code VARCHAR(50) NOT NULL UNIQUE,
+    expiry_time DATETIME NOT NULL,
+    created_by INTEGER NOT NULL REFERENCES user(id) ON DELETE CASCADE,
+    class VARCHAR(50) NOT NULL COLLATE NOCASE,
+    latitude DOUBLE DEFAULT NULL,
+    longitude DOUBLE DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_class_id ON session (class, id);
+CREATE INDEX IF NOT EXISTS idx_session_created_by_id ON session (created_by, id);
+CREATE INDEX IF NOT EXISTS idx_session_expiry_time ON session (expiry_time);
+
+-- 4. Attendance Table
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL REFERENCES student(id) ON DELETE CASCADE,
+    session_id INTEGER NOT NULL REFERENCES session(id) ON DELETE CASCADE,
+    status VARCHAR(10) NOT NULL,
+    timestamp DATETIME DEFAULT (datetime('now', 'localtime')),
+    UNIQUE (student_id, session_id)
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_session_status ON attendance (session_id, status);
+CREATE INDEX IF NOT EXISTS idx_attendance_student_timestamp ON attendance (student_id, timestamp);
+
+-- 5. Per-student totals by class and term (see database_schema.sql)
+CREATE TABLE IF NOT EXISTS student_attendance_summary (
+    student_id INTEGER NOT NULL REFERENCES student(id) ON DELETE CASCADE,
+    class VARCHAR(50) NOT NULL COLLATE NOCASE,
+    term VARCHAR(10) NOT NULL,
+    present_count INTEGER NOT NULL DEFAULT 0,
+    absent_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (student_id, class, term)
+);
@@ -0,0 +1,304 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from datetime import date, datetime
+from functools import lru_cache
+
+import MySQLdb
+
+from db_pool import PooledMySQL
+
+# Storage backends behind `mysql` in app.py, picked by DATABASE_BACKEND:
+#   'mysql'   PooledMySQL (db_pool.py), the MySQL server configured in app.py
+#   'sqlite'  SQLiteDatabase, an embedded database file for single-node
+#             deployments, tests and benchmarks
+# Both expose connection (the app context's connection), detach / release,
+# reset, stats and on_query. Routes keep writing MySQL flavoured SQL and
+# catching MySQLdb errors: the SQLite backend translates both.
+
+SQLITE_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+
+
+def create_storage(app):
+    app.config.setdefault('DATABASE_BACKEND', 'mysql')
+    backend = app.config['DATABASE_BACKEND']
+    if backend == 'mysql':
+        return PooledMySQL(app)
+    if backend == 'sqlite':
+        return SQLiteDatabase(app)
+    raise ValueError(f"Unknown DATABASE_BACKEND {backend!r}, expected 'mysql' or 'sqlite'")
+
+
+# DATETIME values are stored as 'YYYY-MM-DD HH:MM:SS' text, the precision of
+# a MySQL DATETIME column, and read back as datetime objects
+sqlite3.register_adapter(datetime, lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+
+
+# --- MySQL -> SQLite SQL
+
+QUOTED = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")")
+NOOP_UPSERT = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\s+(\w+)\s*=\s*\1\s*$', re.IGNORECASE)
+UPSERT = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+UPSERT_VALUES = re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.IGNORECASE)
+INSERT_IGNORE = re.compile(r'\bINSERT\s+IGNORE\b', re.IGNORECASE)
+
+
+# the statements app.py and importer.py send: %s placeholders, INSERT
+# IGNORE and ON DUPLICATE KEY UPDATE (VALUES(col) is SQLite's excluded.col);
+# CONCAT / IF / YEAR / MONTH are functions registered on each connection.
+# Cached, so the same MySQL text always maps to the same SQLite text and
+# hits the connection's prepared statement cache.
+@lru_cache(maxsize=1024)
+def translate(sql):
+    parts = QUOTED.split(sql)
+    for i in range(0, len(parts), 2):  # even parts are outside quotes
+        part = parts[i].replace('%s', '?').replace('%%', '%')
+        part = INSERT_IGNORE.sub('INSERT OR IGNORE', part)
+        part = NOOP_UPSERT.sub('ON CONFLICT DO NOTHING', part)
+        if UPSERT.search(part):
+            part = UPSERT.sub('ON CONFLICT DO UPDATE SET', part)
+            part = UPSERT_VALUES.sub(r'excluded.\1', part)
+        parts[i] = part
+    return ''.join(parts)
+
+
+def _concat(*values):
+    if any(value is None for value in values):
+        return None
+    return ''.join(str(value) for value in values)
+
+
+def _date_part(start, end):
+    def part(value):
+        if value is None:
+            return None
+        return int(str(value)[start:end])
+    return part
+
+
+SQL_FUNCTIONS = [
+    ('CONCAT', -1, _concat),
+    ('IF', 3, lambda condition, then, otherwise: then if condition else otherwise),
+    ('YEAR', 1, _date_part(0, 4)),
+    ('MONTH', 1, _date_part(5, 7)),
+]
+
+
+# sqlite3 errors are raised as the MySQLdb errors the routes catch, with the
+# MySQL error code of the closest MySQL failure
+def _mysql_error(error):
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        if 'FOREIGN KEY' in message:
+            return MySQLdb.IntegrityError(1452, message)
+        if 'NOT NULL' in message:
+            return MySQLdb.IntegrityError(1048, message)
+        return MySQLdb.IntegrityError(1062, message)
+    if isinstance(error, sqlite3.OperationalError):
+        if 'locked' in message or 'busy' in message:
+            return MySQLdb.OperationalError(1205, message)
+        return MySQLdb.OperationalError(1064, message)
+    if isinstance(error, sqlite3.ProgrammingError):
+        return MySQLdb.ProgrammingError(1064, message)
+    if isinstance(error, sqlite3.DataError):
+        return MySQLdb.DataError(1406, message)
+    return MySQLdb.DatabaseError(2000, message)
+
+
+class SQLiteCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection.raw.cursor()
+
+    def _run(self, method, query, args):
+        sql = translate(query)
+        start = time.perf_counter()
+        try:
+            method(sql, args)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        finally:
+            if self.connection.observer is not None:
+                self.connection.observer(time.perf_counter() - start)
+        return self._cursor.rowcount
+
+    def execute(self, query, args=None):
+        return self._run(self._cursor.execute, query, () if args is None else args)
+
+    def executemany(self, query, args):
+        args = list(args)
+        if not args:
+            return None
+        return self._run(self._cursor.executemany, query, args)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+# sqlite3 connection with the MySQLdb connection methods the app uses;
+# cursor classes (SSCursor for streaming) are accepted and ignored, SQLite
+# cursors already step through results lazily
+class SQLiteConnection:
+    observer = None
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self, cursorclass=None):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        try:
+            self.raw.commit()
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def ping(self):
+        self.raw.execute('SELECT 1')
+
+    def close(self):
+        self.raw.close()
+
+
+# Embedded SQLite database, one file shared by every thread.
+# Each thread keeps its own connection (sqlite3 connections are not shared
+# between threads) with WAL journaling, so readers never wait for the
+# writer, and a prepared statement cache of SQLITE_CACHED_STATEMENTS.
+# Write transactions start with BEGIN IMMEDIATE and wait up to
+# SQLITE_BUSY_TIMEOUT seconds for the write lock. The schema is created
+# from schema_sqlite.sql when the file is new.
+class SQLiteDatabase:
+    backend = 'sqlite'
+
+    def __init__(self, app=None):
+        self.app = None
+        self.on_query = None
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.created_total = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('SQLITE_PATH', 'attendance.sqlite3')
+        app.config.setdefault('SQLITE_BUSY_TIMEOUT', 5)
+        app.config.setdefault('SQLITE_CACHED_STATEMENTS', 256)
+        app.config.setdefault('SQLITE_SYNCHRONOUS', 'NORMAL')  # FULL to fsync every commit in WAL mode
+        app.teardown_appcontext(self.teardown)
+
+    def connect(self):
+        config = self.app.config
+        raw = sqlite3.connect(
+            config['SQLITE_PATH'],
+            timeout=config['SQLITE_BUSY_TIMEOUT'],
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level='IMMEDIATE',
+            check_same_thread=False,  # only so reset() can close it
+            cached_statements=config['SQLITE_CACHED_STATEMENTS'],
+        )
+        raw.execute('PRAGMA journal_mode = WAL')
+        raw.execute(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+        raw.execute('PRAGMA foreign_keys = ON')
+        for name, arguments, func in SQL_FUNCTIONS:
+            raw.create_function(name, arguments, func, deterministic=True)
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    with open(SQLITE_SCHEMA, encoding='utf-8') as f:
+                        raw.executescript(f.read())
+                    self._initialized = True
+        conn = SQLiteConnection(raw)
+        conn.observer = self._observe
+        with self._lock:
+            self._connections.add(conn)
+            self.created_total += 1
+        return conn
+
+    def _observe(self, seconds):
+        if self.on_query is not None:
+            self.on_query(seconds)
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = self._local.connection = self.connect()
+        return conn
+
+    def acquire(self):
+        return self.connection
+
+    # the thread's connection stays open; ending the transaction is all
+    # that giving it back means
+    def release(self, conn, discard=False):
+        self._local.detached = False
+        conn.rollback()
+
+    # a streamed response keeps reading after the teardown, which then must
+    # not end its transaction
+    def detach(self):
+        conn = self.connection
+        self._local.detached = True
+        return conn
+
+    def teardown(self, exception):
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None and not getattr(self._local, 'detached', False):
+            conn.rollback()
+
+    def reset(self):
+        with self._lock:
+            connections = list(self._connections)
+            self._connections = weakref.WeakSet()
+            self._initialized = False
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'path': self.app.config['SQLITE_PATH'],
+                'max_size': 0,
+                'connections': len(self._connections),
+                'created_total': self.created_total,
+            }
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+
+# Helpers for routes that stream large result sets instead of building the
+# whole list in memory and passing it to jsonify.
+
+# records are serialized in groups of this size per yielded chunk
+CHUNK_SIZE = 500
+# bytes per chunk when sending a file
+FILE_CHUNK_SIZE = 64 * 1024
+# rows per worksheet allowed by Excel (header included)
+XLSX_MAX_ROWS = 1048576
+
+
+def dumps(value):
+    # datetimes, Decimals, ... from MySQL rows are written as strings
+    return json.dumps(value, default=str, separators=(',', ':'))
+
+
+# read a cursor chunk by chunk (works with buffered and server-side cursors)
+def iter_rows(cur, size=CHUNK_SIZE):
+    while True:
+        rows = cur.fetchmany(size)
+        if not rows:
+            break
+        yield from rows
+
+
+# newline delimited JSON, one record per line
+def ndjson_stream(records, chunk_size=CHUNK_SIZE):
+    chunk = []
+    for record in records:
+        chunk.append(dumps(record))
+        if len(chunk) >= chunk_size:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+# a regular JSON object {**head, key: [records...], count_key: n} written
+# piece by piece, so the client sees the same shape as a jsonify response
+def json_object_stream(head, key, records, count_key=None, chunk_size=CHUNK_SIZE):
+    opening = dumps(head)[:-1]
+    yield opening + (',' if len(opening) > 1 else '') + dumps(key) + ':['
+    count = 0
+    chunk = []
+    for record in records:
+        chunk.append(dumps(record))
+        count += 1
+        if len(chunk) >= chunk_size:
+            yield (',' if count > len(chunk) else '') + ','.join(chunk)
+            chunk = []
+    if chunk:
+        yield (',' if count > len(chunk) else '') + ','.join(chunk)
+    closing = ']'
+    if count_key:
+        closing += ',' + dumps(count_key) + ':' + str(count)
+    yield closing + '}'
+
+
+# CSV with a header line, written chunk_size rows at a time
+def csv_stream(header, rows, chunk_size=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# write rows to an .xlsx file. In constant_memory mode each row is flushed
+# to disk once the next one starts, so memory does not grow with the rows.
+# Raises RuntimeError if xlsxwriter is missing, ValueError past Excel's
+# row limit.
+def write_xlsx(path, header, rows, sheet_name='Sheet1'):
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise RuntimeError('Writing .xlsx files requires the xlsxwriter package.')
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    try:
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, header)
+        row_number = 0
+        for row_number, row in enumerate(rows, 1):
+            if row_number >= XLSX_MAX_ROWS:
+                raise ValueError(f'More than {XLSX_MAX_ROWS - 1} rows do not fit in one worksheet.')
+            worksheet.write_row(row_number, 0, row)
+    finally:
+        workbook.close()
+    return row_number
+
+
+# read a file in chunks, for Response bodies
+def file_stream(path, chunk_size=FILE_CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,296 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Write-behind buffer with group commit.
+# append() writes the record to an append-only journal segment on local
+# disk and fsyncs it (appends arriving together share one fsync) before it
+# returns. A flusher thread hands everything buffered to flush_fn as one
+# group, every flush_interval seconds or as soon as max_batch records are
+# waiting. Each flush starts a new segment and the old ones are deleted
+# once flush_fn succeeded, so whatever a crashed process had not flushed is
+# still on disk and start() replays it with the first flush after a boot.
+#
+# Every process journals into its own subdirectory of journal_dir and holds
+# an exclusive lock on the `lock` file in it while it runs, so workers
+# sharing journal_dir never touch each other's segments. start() replays the
+# subdirectories whose lock it can take (their process is gone) and removes
+# them once their records are flushed.
+
+LOCK_FILE = 'lock'
+
+
+# flush() could not write the buffered records in time
+class FlushTimeout(Exception):
+    pass
+
+
+# non-blocking exclusive lock on an open file, released when the file is
+# closed or the process dies; False if another process holds it
+def _try_lock(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class WriteBehindBuffer:
+    def __init__(self, journal_dir, flush_fn, flush_interval=0.01, max_batch=500,
+                 fsync=True, retry_interval=1.0, logger=None):
+        self.journal_dir = journal_dir
+        self.flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.retry_interval = retry_interval
+        self.logger = logger
+        # lock order: _sync_lock before _lock
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        self._pending = []
+        self._sealed = []  # closed segments whose records are not flushed yet
+        self._journal = None
+        self._journal_path = None
+        self._segment_dir = None  # this process' subdirectory of journal_dir
+        self._lock_file = None
+        self._adopted = []  # (directory, lock file) of dead processes being replayed
+        self._sequence = 0
+        self._queued = 0  # records ever buffered (appended or replayed)
+        self._flushed_through = 0  # the first this many are flushed
+        self._written = 0  # appends written to the current segment
+        self._synced = 0  # appends of the current segment known to be on disk
+        self._thread = None
+        self._stopped = False
+        # counters
+        self.appended_total = 0
+        self.flushed_total = 0
+        self.flushes_total = 0
+        self.flush_errors_total = 0
+        self.replayed_total = 0
+
+    def _open_segment(self):
+        self._sequence += 1
+        self._journal_path = os.path.join(self._segment_dir, f'segment-{self._sequence:012d}.jsonl')
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+        self._written = 0
+        self._synced = 0
+
+    # seal the current segment (made durable first) and open the next one;
+    # caller holds both locks
+    def _rotate(self):
+        sealed = self._journal_path
+        self._journal.flush()
+        if self.fsync and self._synced < self._written:
+            os.fsync(self._journal.fileno())
+        self._journal.close()
+        self._open_segment()
+        return sealed
+
+    def start(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._claim_segment_dir()
+        # records journaled by processes that are gone go first into the next
+        # flush, their segments are deleted once it succeeded
+        leftovers = self._adopt_dead()
+        records = self._load(leftovers)
+        if not records:
+            # nothing to replay, the directories can go right away
+            for path in leftovers:
+                os.remove(path)
+            leftovers = []
+            self._release_adopted()
+        elif self.logger:
+            self.logger.info(f"Replaying {len(records)} journaled records from {len(leftovers)} segments")
+        with self._lock:
+            self._pending[:0] = records
+            self._sealed[:0] = leftovers
+            self._queued += len(records)
+            self.replayed_total += len(records)
+            self._open_segment()
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='write-behind-flusher', daemon=True)
+            self._thread.start()
+
+    # a new subdirectory, locked before anything is written to it; if a
+    # starting process took the lock in between (and will remove the empty
+    # directory), try another one
+    def _claim_segment_dir(self):
+        while True:
+            path = os.path.join(self.journal_dir, f'{os.getpid()}-{uuid.uuid4().hex[:12]}')
+            os.makedirs(path)
+            lock_file = open(os.path.join(path, LOCK_FILE), 'w')
+            if _try_lock(lock_file):
+                self._segment_dir = path
+                self._lock_file = lock_file
+                self._sequence = 0
+                return
+            lock_file.close()
+
+    # segments of the subdirectories whose owner is gone, in order; their
+    # locks are kept until the segments are flushed so no other starting
+    # process replays them too
+    def _adopt_dead(self):
+        segments = []
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, '*', ''))):
+            path = os.path.dirname(path)
+            if path == self._segment_dir:
+                continue
+            try:
+                lock_file = open(os.path.join(path, LOCK_FILE), 'r+')
+            except OSError:
+                continue  # being created, or being removed
+            if not _try_lock(lock_file):
+                lock_file.close()  # a live process
+                continue
+            self._adopted.append((path, lock_file))
+            segments.extend(sorted(glob.glob(os.path.join(path, 'segment-*.jsonl'))))
+        return segments
+
+    # remove the adopted subdirectories, their segments are flushed
+    def _release_adopted(self):
+        adopted, self._adopted = self._adopted, []
+        for path, lock_file in adopted:
+            lock_file.close()
+            try:
+                os.remove(os.path.join(path, LOCK_FILE))
+                os.rmdir(path)
+            except OSError:
+                pass
+
+    def _load(self, paths):
+        records = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass  # torn last line from a crash mid-write
+        return records
+
+    # journal a record and buffer it for the next group commit
+    def append(self, record):
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            if self._journal is None:
+                # nothing would flush the record, and the process' segment
+                # directory is only claimed by start()
+                raise RuntimeError('WriteBehindBuffer.append() called before start()')
+            self._journal.write(line)
+            self._journal.flush()
+            self._written += 1
+            ticket = (self._journal_path, self._written)
+            self._pending.append(record)
+            self._queued += 1
+            self.appended_total += 1
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        if self.fsync:
+            self._sync(ticket)
+
+    # group fsync: whoever gets the lock syncs everything written so far, and
+    # appends covered by that fsync return without one of their own
+    def _sync(self, ticket):
+        path, written = ticket
+        with self._sync_lock:
+            if path != self._journal_path or self._synced >= written:
+                return  # sealed segments were synced by _rotate
+            with self._lock:
+                target = self._written
+                fd = self._journal.fileno()
+            os.fsync(fd)
+            self._synced = target
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._pending) < self.max_batch and not self._stopped:
+                    # collect a group for up to one interval
+                    self._cond.wait(self.flush_interval)
+                if not self._pending:
+                    if self._stopped:
+                        return
+                    continue
+            with self._sync_lock:
+                with self._lock:
+                    batch = self._pending
+                    self._pending = []
+                    through = self._queued
+                    segments = self._sealed + [self._rotate()]
+                    self._sealed = []
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                self.flush_errors_total += 1
+                if self.logger:
+                    self.logger.error(f"Write-behind flush of {len(batch)} records failed: {e}")
+                with self._lock:
+                    self._pending[:0] = batch
+                    self._sealed[:0] = segments
+                time.sleep(self.retry_interval)
+                continue
+            self.flushes_total += 1
+            self.flushed_total += len(batch)
+            with self._cond:
+                self._flushed_through = through
+                self._cond.notify_all()
+            for path in segments:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            if self._adopted:
+                self._release_adopted()
+
+    # flush now and wait until every record buffered so far is written;
+    # raises FlushTimeout if that takes longer than timeout seconds (the
+    # records stay buffered and are retried as usual)
+    def flush(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            target = self._queued
+            if self._thread is None or self._flushed_through >= target:
+                return
+            self._cond.notify_all()
+            while self._flushed_through < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise FlushTimeout(f'{target - self._flushed_through} buffered records not flushed '
+                                       f'within {timeout} seconds')
+                self._cond.wait(remaining)
+
+    # flush what is buffered and stop the flusher thread (whatever cannot be
+    # flushed within the timeout stays in the journal for the next start)
+    def stop(self, timeout=10.0):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'appended_total': self.appended_total,
+            'flushed_total': self.flushed_total,
+            'flushes_total': self.flushes_total,
+            'flush_errors_total': self.flush_errors_total,
+            'replayed_total': self.replayed_total,
+        }